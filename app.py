@@ -8,14 +8,24 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
+from fastapi.responses import JSONResponse
 from routes.films import router as films_router
 from routes.pages import router as pages_router
 from routes.meta import router as meta_router
-from db.my_sql import create_search_indexes
+from routes.posters import router as posters_router
+from db.my_sql import create_search_indexes, start_background_refresh, get_catalog_by_popularity
+from db.my_sql_async import close_pool
+from utils.log_writer import stop_log_writer
+from utils.pagination import InvalidCursor
+from utils.poster_prefetch import start_prefetcher
 
 # Создаем индексы для ускорения поиска
 print("Creating database indexes...")
 create_search_indexes()
+# Рейтинг популярности обновляется в фоне, а не на каждый запрос
+start_background_refresh()
+# Постеры каталога загружаются в фоне, начиная с популярных и новых фильмов
+start_prefetcher(get_catalog_by_popularity)
 
 
 class CharsetMiddleware(BaseHTTPMiddleware):
@@ -48,9 +58,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(InvalidCursor)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+    """Возвращает 400 для повреждённого курсора пагинации"""
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+
+@app.on_event("shutdown")
+async def close_mysql_pool():
+    """Закрывает соединения асинхронного пула MySQL при остановке приложения"""
+    await close_pool()
+
+
+@app.on_event("shutdown")
+def flush_search_log():
+    """Дописывает накопленные поисковые запросы в MongoDB при остановке приложения"""
+    stop_log_writer()
+
+
 app.include_router(pages_router)
 app.include_router(films_router)
 app.include_router(meta_router)
+app.include_router(posters_router)
 
 
 if __name__ == "__main__":
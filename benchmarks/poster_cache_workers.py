@@ -0,0 +1,83 @@
+"""Доля попаданий кэша постеров при нескольких воркерах
+
+Запускает N процессов, каждый из которых, как воркер uvicorn, запрашивает постеры
+для случайных страниц каталога; промах имитирует запрос к TMDB и записывает результат.
+Сравниваются общий файл кэша (как в приложении) и отдельный файл на каждый процесс
+(как было с per-process dict + poster_cache.json).
+
+    python benchmarks/poster_cache_workers.py --workers 4 --titles 1000 --lookups 3000
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _worker(db_path: str, seed: int, titles: int, lookups: int, fetch_delay: float, results) -> None:
+    from utils import poster_cache
+
+    poster_cache.CACHE_DB = db_path
+    poster_cache.LEGACY_CACHE_FILE = db_path + ".missing.json"
+    rng = random.Random(seed)
+    fetches = 0
+    for _ in range(lookups):
+        # Популярные фильмы запрашивают чаще, но хвост каталога тоже просматривают
+        film_id = int(titles * rng.random() ** 2)
+        title = f"FILM {film_id}"
+        if poster_cache.get_entry(film_id, title) is None:
+            time.sleep(fetch_delay)
+            fetches += 1
+            poster_cache.set(film_id, title, f"https://image.tmdb.org/t/p/w500/{film_id}.jpg")
+    results.put((fetches, poster_cache.get_stats()))
+
+
+def run(workers: int, titles: int, lookups: int, fetch_delay: float, shared: bool) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        results = multiprocessing.Queue()
+        processes = []
+        started = time.monotonic()
+        for i in range(workers):
+            db_path = os.path.join(tmp, "posters.db" if shared else f"posters-{i}.db")
+            process = multiprocessing.Process(
+                target=_worker, args=(db_path, i, titles, lookups, fetch_delay, results)
+            )
+            process.start()
+            processes.append(process)
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = time.monotonic() - started
+
+    fetches = sum(item[0] for item in collected)
+    shared_hits = sum(item[1]["shared_hits"] for item in collected)
+    total = workers * lookups
+    return {
+        "mode": "shared" if shared else "per-process",
+        "workers": workers,
+        "lookups": total,
+        "tmdb_fetches": fetches,
+        "hit_ratio": round(1 - fetches / total, 4),
+        "shared_hits": shared_hits,
+        "seconds": round(elapsed, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--titles", type=int, default=1000)
+    parser.add_argument("--lookups", type=int, default=3000, help="запросов на один воркер")
+    parser.add_argument("--fetch-delay", type=float, default=0.002, help="имитация запроса к TMDB, секунды")
+    args = parser.parse_args()
+
+    for shared in (False, True):
+        print(run(args.workers, args.titles, args.lookups, args.fetch_delay, shared))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+from utils.text import normalize_name
+
+
+class ActorIndex:
+    """Нормализованные полные имена актёров -> actor_id"""
+
+    def __init__(self, rows: list[dict]):
+        # actor_id -> имя в том виде, как его отдаёт CONCAT(first_name, ' ', last_name)
+        self._display: dict[int, str] = {}
+        self._by_name: dict[str, list[int]] = {}
+        for row in rows:
+            full_name = f"{row['first_name']} {row['last_name']}"
+            self._display[row["actor_id"]] = full_name
+            self._by_name.setdefault(normalize_name(full_name), []).append(row["actor_id"])
+        self._results: dict[str, tuple[int, ...]] = {}
+
+    def match(self, full_name: str) -> tuple[int, ...]:
+        """actor_id актёров, чьё полное имя содержит full_name (как LIKE '%name%')"""
+        needle = normalize_name(full_name)
+        cached = self._results.get(needle)
+        if cached is not None:
+            return cached
+        result = tuple(
+            actor_id
+            for name, actor_ids in self._by_name.items() if needle in name
+            for actor_id in actor_ids
+        )
+        if len(self._results) >= 256:
+            self._results.clear()
+        self._results[needle] = result
+        return result
+
+    def display_name(self, actor_id: int) -> str:
+        return self._display.get(actor_id, "")
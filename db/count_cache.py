@@ -0,0 +1,71 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class CountCache:
+    """Ограниченный по размеру кэш результатов COUNT(*) с TTL
+
+    Ключ — (имя функции, аргументы). При переполнении вытесняется давно не использованный ключ.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (total, время записи)
+        self._entries: OrderedDict = OrderedDict()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evicted": 0,
+            "invalidated": 0,
+        }
+
+    def get(self, key: tuple) -> int | None:
+        """Возвращает сохранённый total или None, если его нет или он устарел"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and time.monotonic() - entry[1] > self.ttl:
+                del self._entries[key]
+                self._stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[0]
+
+    def set(self, key: tuple, total: int) -> None:
+        with self._lock:
+            self._entries[key] = (total, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._stats["evicted"] += 1
+
+    def invalidate(self, name: str | None = None) -> int:
+        """Удаляет все записи или только записи функции name; возвращает число удалённых"""
+        with self._lock:
+            if name is None:
+                keys = list(self._entries)
+            else:
+                keys = [key for key in self._entries if key[0] == name]
+            for key in keys:
+                del self._entries[key]
+            self._stats["invalidated"] += len(keys)
+            return len(keys)
+
+    def stats(self) -> dict:
+        """Счётчики попаданий и промахов"""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_ratio": self._stats["hits"] / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+            }
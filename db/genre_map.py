@@ -0,0 +1,38 @@
+class GenreMap:
+    """Жанры фильмов в памяти: film_id -> ID жанров
+
+    Заменяет LEFT JOIN film_category/category с GROUP_CONCAT в запросах списков.
+    """
+
+    def __init__(self, categories: list[dict], links: list[dict]):
+        self._names: dict[int, str] = {row["category_id"]: row["name"] for row in categories}
+        by_film: dict[int, set[int]] = {}
+        for row in links:
+            by_film.setdefault(row["film_id"], set()).add(row["category_id"])
+        # Жанры храним в порядке имён — как GROUP_CONCAT(... ORDER BY c.name)
+        self._by_film: dict[int, tuple[int, ...]] = {
+            film_id: tuple(sorted(ids, key=lambda cid: self._names.get(cid, "")))
+            for film_id, ids in by_film.items()
+        }
+        # Сочетаний жанров немного, поэтому готовые строки кэшируются по кортежу ID
+        self._labels: dict[tuple[int, ...], str] = {}
+
+    def genre_ids(self, film_id: int) -> tuple[int, ...]:
+        return self._by_film.get(film_id, ())
+
+    def label(self, film_id: int) -> str | None:
+        """Строка жанров через запятую; None, если жанров нет (как GROUP_CONCAT без строк)"""
+        ids = self._by_film.get(film_id)
+        if not ids:
+            return None
+        label = self._labels.get(ids)
+        if label is None:
+            names = dict.fromkeys(self._names[cid] for cid in ids if cid in self._names)
+            label = self._labels[ids] = ", ".join(names)
+        return label
+
+    def attach(self, films: list[dict]) -> list[dict]:
+        """Добавляет поле genres к строкам фильмов"""
+        for film in films:
+            film["genres"] = self.label(film["film_id"])
+        return films
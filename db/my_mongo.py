@@ -4,9 +4,12 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # добавляет корень проекта в пути поиска модулей Python, чтобы импорты работали независимо от того, откуда запущен файл
 
-from pymongo import MongoClient
-from datetime import datetime, timezone
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime, timedelta, timezone
 from settings import settings
+from utils.log_writer import bucket_start, query_key
+from utils.text import normalize_name as normalize_query
 print("MONGO_URL used:", settings.MONGO_URL)
 print("MONGO_DB:", settings.MONGO_DB)
 print("COLLECTION:", settings.MONGO_LOG_COLLECTION)
@@ -19,97 +22,121 @@ def ping():
     client.admin.command("ping")
 
 
+# Сводка по запросам (_id — ключ запроса, count, latest, search_type, params)
+# обновляется при записи логов в utils/log_writer, чтение — выборка по индексу
+rollup = db[settings.MONGO_QUERY_ROLLUP]
+migrations = db["migrations"]
+buckets = db[settings.MONGO_QUERY_BUCKETS]
+_rollup_ready = False
+
+def _backfill_rollup() -> None:
+    """Однократно строит сводку по уже накопленным логам (один воркер, отметка в migrations)"""
+    try:
+        migrations.insert_one({"_id": "query_rollup_backfill", "started_at": datetime.now(timezone.utc)})
+    except DuplicateKeyError:
+        return
+    print("Building query rollup from search logs...")
+    try:
+        _aggregate_into_rollup()
+    except Exception:
+        # Сводку построит следующий запрос
+        migrations.delete_one({"_id": "query_rollup_backfill"})
+        raise
+
+
+def _parse_timestamp(value) -> datetime | None:
+    """Время старых документов хранилось ISO-строкой"""
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    try:
+        return _parse_timestamp(datetime.fromisoformat(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _legacy_entry(doc: dict) -> tuple[str, str, str | None, dict]:
+    """(ключ, текст для показа, search_type, params) документа, записанного до utils/log_writer
+
+    Ключ вычисляется той же query_key, что и при записи, поэтому старые и новые логи
+    одного запроса попадают в одну запись сводки.
+    """
+    if "search_type" in doc:
+        search_type, params = doc["search_type"], doc.get("params") or {}
+        key = doc.get("query_key") or query_key(search_type, params)
+        text = params.get("query") if search_type in ("keyword", "manual") else None
+    else:
+        # Старый формат: query, year_from, year_to, genres на верхнем уровне
+        search_type = None
+        params = {"year_from": doc.get("year_from"), "year_to": doc.get("year_to"), "genres": doc.get("genres")}
+        text = doc.get("query")
+        key = normalize_query(str(text or ""))
+    display = " ".join(str(text).split()) if text else key
+    return key, display, search_type, params
+
+
+def _aggregate_into_rollup() -> None:
+    grouped: dict[str, dict] = {}
+    # Логи, записанные utils/log_writer, уже учтены в сводке при записи
+    for doc in collection.find({"in_rollup": {"$exists": False}}):
+        key, display, search_type, params = _legacy_entry(doc)
+        if not key:
+            continue
+        entry = grouped.setdefault(key, {"count": 0, "latest": None})
+        entry["count"] += 1
+        latest = _parse_timestamp(doc.get("timestamp") or doc.get("last_searched"))
+        if entry["latest"] is None or (latest is not None and latest >= entry["latest"]):
+            entry.update(latest=latest, query=display, search_type=search_type, params=params)
+    if not grouped:
+        return
+    requests = []
+    for key, entry in grouped.items():
+        update = {
+            # Счётчики старых логов и логов, уже учтённых writer'ом, не пересекаются
+            "$inc": {"count": entry["count"]},
+            # Текст и параметры последнего запроса, если writer ещё не записал более свежие
+            "$setOnInsert": {"query": entry["query"], "search_type": entry["search_type"], "params": entry["params"]},
+        }
+        if entry["latest"] is not None:
+            update["$max"] = {"latest": entry["latest"]}
+        requests.append(UpdateOne({"_id": key}, update, upsert=True))
+    rollup.bulk_write(requests, ordered=False)
+
+
+def _ensure_rollup() -> None:
+    global _rollup_ready
+    if _rollup_ready:
+        return
+    rollup.create_index([("count", -1), ("latest", -1)])
+    rollup.create_index([("latest", -1)])
+    _backfill_rollup()
+    _rollup_ready = True
+
+
+def _format_timestamp(value) -> str:
+    if not value:
+        return datetime.now(timezone.utc).isoformat()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _rollup_item(doc: dict) -> dict:
+    return {
+        "_id": str(doc["_id"]),
+        "query": doc.get("query") or doc["_id"],
+        "count": doc.get("count", 0),
+        "search_type": doc.get("search_type"),
+        "params": doc.get("params") or {},
+        "timestamp": _format_timestamp(doc.get("latest")),
+    }
+
+
 def get_popular_queries(limit: int = 5):
     """Самые популярные (по количеству запросов) с подсчетом количества"""
     try:
-        # Сначала пробуем новый формат с search_type и params
-        pipeline = [
-            {
-                "$group": {
-                    "_id": {
-                        "$cond": {
-                            "if": { "$eq": ["$search_type", "keyword"] },
-                            "then": "$params.query",
-                            "else": {
-                                "$cond": {
-                                    "if": { "$eq": ["$search_type", "genre"] },
-                                    "then": { "$concat": ["genre:", { "$toString": "$params.category_id" }] },
-                                    "else": {
-                                        "$cond": {
-                                            "if": { "$eq": ["$search_type", "year"] },
-                                            "then": { "$toString": "$params.year" },
-                                            "else": "unknown"
-                                        }
-                                    }
-                                }
-                            }
-                        }
-                    },
-                    "count": { "$sum": 1 },
-                    "latest_search": { "$max": "$timestamp" },
-                    "search_type": { "$first": "$search_type" },
-                    "params": { "$first": "$params" }
-                }
-            },
-            {
-                "$project": {
-                    "query": "$_id",
-                    "count": 1,
-                    "latest_search": 1,
-                    "search_type": 1,
-                    "params": 1,
-                    "_id": 0
-                }
-            },
-            { "$sort": { "count": -1, "latest_search": -1 } },
-            { "$limit": limit }
-        ]
-        
-        cursor = collection.aggregate(pipeline)
-        result = list(cursor)
-        
-        # Если результатов нет в новом формате, пробуем старый формат
-        if len(result) == 0:
-            pipeline = [
-                {
-                    "$group": {
-                        "_id": "$query",
-                        "count": { "$sum": 1 },
-                        "latest_search": { "$max": "$timestamp" },
-                        "year_from": { "$first": "$year_from" },
-                        "year_to": { "$first": "$year_to" },
-                        "genres": { "$first": "$genres" }
-                    }
-                },
-                { "$sort": { "count": -1, "latest_search": -1 } },
-                { "$limit": limit }
-            ]
-            
-            for doc in collection.aggregate(pipeline):
-                if doc["_id"]:  # Убедимся, что query не пустой
-                    clean_doc = {
-                        "_id": str(doc["_id"]),  # Используем query как _id для совместимости
-                        "query": doc["_id"],
-                        "count": doc["count"],
-                        "year_from": doc["year_from"],
-                        "year_to": doc["year_to"],
-                        "genres": doc["genres"] if doc["genres"] else []
-                    }
-                    
-                    # Обрабатываем timestamp
-                    if doc["latest_search"]:
-                        if hasattr(doc["latest_search"], 'isoformat'):
-                            clean_doc["timestamp"] = doc["latest_search"].isoformat()
-                        elif isinstance(doc["latest_search"], str):
-                            clean_doc["timestamp"] = doc["latest_search"]
-                        else:
-                            clean_doc["timestamp"] = str(doc["latest_search"])
-                    else:
-                        clean_doc["timestamp"] = datetime.now(timezone.utc).isoformat()
-                    
-                    result.append(clean_doc)
-        
-        return result
+        _ensure_rollup()
+        cursor = rollup.find({}, sort=[("count", -1), ("latest", -1)], limit=limit)
+        return [_rollup_item(doc) for doc in cursor]
     except Exception as error:
         print(f"Error reading popular queries: {error}")
         return []
@@ -118,118 +145,50 @@ def get_popular_queries(limit: int = 5):
 def get_recent_queries(limit: int = 5):
     """уникальные запросы"""
     try:
-        # Сначала пробуем новый формат (search_type, params) с группировкой для уникальности
+        _ensure_rollup()
+        cursor = rollup.find({}, sort=[("latest", -1)], limit=limit)
+        return [_rollup_item(doc) for doc in cursor]
+    except Exception as e:
+        print(f"Error reading recent queries: {e}")
+        return []
+
+
+# Окно /meta/trending -> (гранулярность счётчиков, длина окна)
+TRENDING_WINDOWS = {
+    "1h": ("hour", timedelta(hours=1)),
+    "24h": ("hour", timedelta(hours=24)),
+    "7d": ("day", timedelta(days=7)),
+}
+
+
+def get_trending_queries(window: str = "24h", limit: int = 10):
+    """Самые частые запросы за окно по почасовым или посуточным счётчикам
+
+    Окно выравнивается по началу интервала: «1h» включает текущий и предыдущий час.
+    Читаются только счётчики окна — несколько документов на запрос, а не сырые логи.
+    """
+    granularity, length = TRENDING_WINDOWS[window]
+    since = bucket_start(datetime.now(timezone.utc) - length, granularity)
+    try:
         pipeline = [
+            {"$match": {"granularity": granularity, "start": {"$gte": since}}},
+            {"$sort": {"start": 1}},
             {
                 "$group": {
-                    "_id": {
-                        "$cond": {
-                            "if": { "$eq": ["$search_type", "keyword"] },
-                            "then": "$params.query",
-                            "else": {
-                                "$cond": {
-                                    "if": { "$eq": ["$search_type", "genre"] },
-                                    "then": { "$concat": ["genre:", { "$toString": "$params.category_id" }] },
-                                    "else": {
-                                        "$cond": {
-                                            "if": { "$eq": ["$search_type", "year"] },
-                                            "then": { "$toString": "$params.year" },
-                                            "else": "unknown"
-                                        }
-                                    }
-                                }
-                            }
-                        }
-                    },
-                    "latest_timestamp": { "$max": "$timestamp" },
-                    "search_type": { "$first": "$search_type" },
-                    "params": { "$first": "$params" },
-                    "_original_id": { "$first": "$_id" }
+                    "_id": "$query_key",
+                    "count": {"$sum": "$count"},
+                    "latest": {"$max": "$latest"},
+                    "query": {"$last": "$query"},
+                    "search_type": {"$last": "$search_type"},
+                    "params": {"$last": "$params"},
                 }
             },
-            { "$sort": { "latest_timestamp": -1 } },
-            { "$limit": limit }
+            {"$sort": {"count": -1, "latest": -1}},
+            {"$limit": limit},
         ]
-        
-        cursor = collection.aggregate(pipeline)
-        result = []
-        
-        for doc in cursor:
-            clean_doc = {
-                "_id": str(doc["_original_id"])
-            }
-            
-            # Обрабатываем новый формат
-            if "search_type" in doc and "params" in doc:
-                clean_doc["search_type"] = doc["search_type"]
-                clean_doc["params"] = doc["params"]
-                
-                # Для совместимости добавляем поле query
-                if doc["search_type"] == "keyword" and "query" in doc["params"]:
-                    clean_doc["query"] = doc["params"]["query"]
-                elif doc["search_type"] == "genre" and "category_id" in doc["params"]:
-                    clean_doc["query"] = f"genre:{doc['params']['category_id']}"
-                elif doc["search_type"] == "year" and "year" in doc["params"]:
-                    clean_doc["query"] = str(doc["params"]["year"])
-                else:
-                    clean_doc["query"] = "unknown"
-            
-            # Обрабатываем timestamp
-            if "latest_timestamp" in doc:
-                if hasattr(doc["latest_timestamp"], 'isoformat'):
-                    clean_doc["timestamp"] = doc["latest_timestamp"].isoformat()
-                elif isinstance(doc["latest_timestamp"], str):
-                    clean_doc["timestamp"] = doc["latest_timestamp"]
-                else:
-                    clean_doc["timestamp"] = str(doc["latest_timestamp"])
-            else:
-                clean_doc["timestamp"] = datetime.now(timezone.utc).isoformat()
-            
-            result.append(clean_doc)
-        
-        # Если результатов нет в новом формате, пробуем старый формат с группировкой для уникальности
-        if len(result) == 0:
-            pipeline = [
-                {
-                    "$group": {
-                        "_id": "$query",
-                        "latest_timestamp": { "$max": { "$ifNull": ["$timestamp", "$last_searched"] } },
-                        "year_from": { "$first": "$year_from" },
-                        "year_to": { "$first": "$year_to" },
-                        "genres": { "$first": "$genres" },
-                        "_original_id": { "$first": "$_id" }
-                    }
-                },
-                { "$match": { "_id": { "$ne": None, "$ne": "" } } },
-                { "$sort": { "latest_timestamp": -1 } },
-                { "$limit": limit }
-            ]
-            
-            for doc in collection.aggregate(pipeline):
-                clean_doc = {
-                    "_id": str(doc["_original_id"]),
-                    "query": doc["_id"],
-                    "year_from": doc["year_from"],
-                    "year_to": doc["year_to"],
-                    "genres": doc["genres"] if doc["genres"] else []
-                }
-                
-                # Обрабатываем timestamp
-                if "latest_timestamp" in doc:
-                    if hasattr(doc["latest_timestamp"], 'isoformat'):
-                        clean_doc["timestamp"] = doc["latest_timestamp"].isoformat()
-                    elif isinstance(doc["latest_timestamp"], str):
-                        clean_doc["timestamp"] = doc["latest_timestamp"]
-                    else:
-                        clean_doc["timestamp"] = str(doc["latest_timestamp"])
-                else:
-                    clean_doc["timestamp"] = datetime.now(timezone.utc).isoformat()
-                
-                result.append(clean_doc)
-        
-        return result
+        return [_rollup_item(doc) for doc in buckets.aggregate(pipeline)]
     except Exception as e:
-        print(f"Error reading recent queries: {e}")
+        print(f"Error reading trending queries: {e}")
         return []
 
 
@@ -1,5 +1,13 @@
+import random
 import mysql.connector
 from settings import settings
+from db.pool import ConnectionPool
+from db.snapshot import Snapshot
+from db.title_index import TitleIndex
+from db.actor_index import ActorIndex
+from db.popularity import PopularityRanking
+from db.genre_map import GenreMap
+from db.count_cache import CountCache
 
 
 dbconfig = {
@@ -11,6 +19,15 @@ dbconfig = {
 
 _cfg = dbconfig.copy()
 
+_pool = ConnectionPool(
+    _cfg,
+    size=settings.MYSQL_POOL_SIZE,
+    max_overflow=settings.MYSQL_POOL_MAX_OVERFLOW,
+    recycle=settings.MYSQL_POOL_RECYCLE,
+    timeout=settings.MYSQL_POOL_TIMEOUT,
+    pre_ping=settings.MYSQL_POOL_PRE_PING,
+)
+
 def create_search_indexes():
     """Создать индексы для ускорения поиска"""
     with mysql.connector.connect(**_cfg) as conn:
@@ -63,117 +80,225 @@ def create_search_indexes():
 
 def query_all(sql: str, params: tuple=())->list[dict]:
     """Выполняет SQL запрос и возвращает результат в виде списка словарей"""
-    with mysql.connector.connect(**_cfg) as conn:
+    with _pool.connection() as conn:
         with conn.cursor(dictionary=True) as cursor:
             cursor.execute(sql, params)
             return cursor.fetchall()
 
 
-def get_films(limit: int = 10, offset:int = 0)->list[dict]:
-    """Получает список фильмов с пагинацией"""
-    sql = """
-        SELECT f.film_id, f.title, f.release_year, f.length, f.rating, '/static/images/no-poster.svg' AS poster_url,
-               GROUP_CONCAT(DISTINCT c.name ORDER BY c.name SEPARATOR ', ') AS genres
+def get_pool_stats() -> dict:
+    """Возвращает счётчики пула соединений MySQL"""
+    return _pool.stats()
+
+
+def _load_title_index() -> TitleIndex:
+    """Строит инвертированный индекс названий из таблицы film"""
+    return TitleIndex(query_all("SELECT film_id, title, release_year FROM film;"))
+
+
+_title_index = Snapshot("title_index", _load_title_index, ttl=settings.SEARCH_INDEX_TTL)
+
+
+def _load_actor_index() -> ActorIndex:
+    """Строит индекс нормализованных имён из таблицы actor"""
+    return ActorIndex(query_all("SELECT actor_id, first_name, last_name FROM actor;"))
+
+
+_actor_index = Snapshot("actor_index", _load_actor_index, ttl=settings.SEARCH_INDEX_TTL)
+
+
+def _load_popularity(previous: PopularityRanking | None) -> PopularityRanking:
+    """Дополняет рейтинг популярности арендами, появившимися с прошлого обновления"""
+    last_rental_id = previous.last_rental_id if previous else 0
+    deltas = query_all("""
+        SELECT i.film_id, COUNT(*) AS rentals, MAX(r.rental_id) AS last_rental_id
+        FROM rental r
+        JOIN inventory i ON i.inventory_id = r.inventory_id
+        WHERE r.rental_id > %s
+        GROUP BY i.film_id;
+    """, (last_rental_id,))
+    films = query_all("SELECT film_id, release_year FROM film;")
+    return PopularityRanking.updated(previous, films, deltas)
+
+
+# TTL с запасом: обычно рейтинг обновляет фоновый поток, а не запрос
+_popularity = Snapshot("popularity", _load_popularity,
+                       ttl=settings.POPULARITY_REFRESH_INTERVAL * 2, incremental=True)
+
+
+def _load_film_ids() -> tuple[int, ...]:
+    """Загружает все film_id для случайной выборки"""
+    return tuple(row["film_id"] for row in query_all("SELECT film_id FROM film;"))
+
+
+_film_ids = Snapshot("film_ids", _load_film_ids, ttl=settings.CATALOG_SNAPSHOT_TTL)
+
+
+def _load_genre_map() -> GenreMap:
+    """Загружает справочник жанров и связи film_category"""
+    categories = query_all("SELECT category_id, name FROM category;")
+    links = query_all("SELECT film_id, category_id FROM film_category;")
+    return GenreMap(categories, links)
+
+
+_genre_map = Snapshot("genre_map", _load_genre_map, ttl=settings.CATALOG_SNAPSHOT_TTL)
+
+
+def attach_genres(films: list[dict]) -> list[dict]:
+    """Добавляет жанры к уже выбранной странице фильмов"""
+    return _genre_map.get().attach(films)
+
+
+# total для пагинации: каталог меняется редко, поэтому COUNT(*) не повторяем на каждой странице
+_counts = CountCache(maxsize=settings.COUNT_CACHE_SIZE, ttl=settings.COUNT_CACHE_TTL)
+
+
+def invalidate_counts(name: str | None = None) -> int:
+    """Сбрасывает кэш подсчётов целиком или для одной функции (например, "count_films_by_year")"""
+    return _counts.invalidate(name)
+
+
+def get_count_cache_stats() -> dict:
+    """Возвращает счётчики попаданий и промахов кэша подсчётов"""
+    return _counts.stats()
+
+
+def start_background_refresh() -> None:
+    """Запускает фоновое обновление рейтинга популярности по расписанию"""
+    _popularity.start_refresher(settings.POPULARITY_REFRESH_INTERVAL)
+
+
+def _in_placeholders(values) -> str:
+    """Плейсхолдеры %s для условия IN (...)"""
+    return ", ".join(["%s"] * len(values))
+
+
+def _seek_condition(after: tuple[int, int] | None, alias: str = "f") -> tuple[str, tuple]:
+    """Условие keyset-пагинации: строки строго после (release_year, film_id) в порядке DESC"""
+    if after is None:
+        return "TRUE", ()
+    year, film_id = after
+    condition = f"({alias}.release_year < %s OR ({alias}.release_year = %s AND {alias}.film_id < %s))"
+    return condition, (year, year, film_id)
+
+
+def _new_films_min_year() -> int:
+    """Минимальный год выпуска для новинок (за последние 5 лет)"""
+    # Define "new" as films from the last 5 years
+    current_year = 2025  # Could be dynamic, but using fixed year for consistency
+    return current_year - 5  # Films from 2020 onwards
+
+
+# -----------------------------
+# SQL-запросы: (sql, params)
+# Общие для синхронного API ниже и асинхронного db/my_sql_async.py
+# -----------------------------
+
+def _films_query(limit: int, offset: int, after: tuple[int, int] | None) -> tuple[str, tuple]:
+    seek, seek_params = _seek_condition(after)
+    sql = f"""
+        SELECT f.film_id, f.title, f.release_year, f.length, f.rating, '/static/images/no-poster.svg' AS poster_url
         FROM film f
-        LEFT JOIN film_category fc ON f.film_id = fc.film_id
-        LEFT JOIN category c ON fc.category_id = c.category_id
-        GROUP BY f.film_id, f.title, f.release_year, f.length, f.rating
+        WHERE {seek}
         ORDER BY f.release_year DESC, f.film_id DESC
         LIMIT %s OFFSET %s;
     """
-    return query_all(sql,(limit, offset))
+    return sql, (*seek_params, limit, offset)
 
 
-def get_films_count() -> int:
-    """Получает общее количество фильмов"""
-    sql = "SELECT COUNT(*) AS total FROM film;"
-    row = query_all(sql)
-    return row[0]["total"] if row else 0
+def _films_count_query() -> tuple[str, tuple]:
+    return "SELECT COUNT(*) AS total FROM film;", ()
 
 
-def get_film_by_id(film_id: int) -> dict:
-    """Получает информацию о фильме по ID"""
+def _film_by_id_query(film_id: int) -> tuple[str, tuple]:
     sql = """
         SELECT f.film_id, f.title, f.release_year, f.length, f.rating, f.description,
                '/static/images/no-poster.svg' AS poster_url
         FROM film f
         WHERE f.film_id = %s;
     """
-    result = query_all(sql, (film_id,))
-    return result[0] if result else None
+    return sql, (film_id,)
 
 
-def search_films_by_keyword(keyword:str, limit: int = 10, offset:int = 0)->list[dict]:
-    """Поиск фильмов по ключевому слову в названии"""
-    # Поиск по всем жанрам с JOIN для получения информации о жанрах
-    sql = """
-      SELECT f.film_id, f.title, f.release_year, f.length, f.rating, '/static/images/no-poster.svg' AS poster_url,
-             GROUP_CONCAT(DISTINCT c.name ORDER BY c.name SEPARATOR ', ') AS genres
-      FROM film f
-      LEFT JOIN film_category fc ON f.film_id = fc.film_id
-      LEFT JOIN category c ON fc.category_id = c.category_id
-      WHERE f.title LIKE %s
-      GROUP BY f.film_id, f.title, f.release_year, f.length, f.rating
-      ORDER BY f.release_year DESC, f.film_id DESC
-      LIMIT %s OFFSET %s;
+def _films_by_ids_query(film_ids: list[int]) -> tuple[str, tuple]:
+    sql = f"""
+        SELECT f.film_id, f.title, f.release_year, f.length, f.rating, '/static/images/no-poster.svg' AS poster_url
+        FROM film f
+        WHERE f.film_id IN ({_in_placeholders(film_ids)});
     """
-    # Используем паттерн поиска для любого места в названии
-    search_pattern = f"%{keyword.strip().lower()}%"
-    return query_all(sql, (search_pattern, limit, offset))
+    return sql, tuple(film_ids)
 
 
-def count_films_by_keyword(keyword: str) -> int:
-    """Подсчитывает количество фильмов по ключевому слову"""
-    sql = """
-        SELECT COUNT(DISTINCT f.film_id) AS total
-        FROM film f
-        LEFT JOIN film_category fc ON f.film_id = fc.film_id
-        LEFT JOIN category c ON fc.category_id = c.category_id
-        WHERE f.title LIKE %s;
-    """
-    search_pattern = f"%{keyword.strip().lower()}%"
-    row = query_all(sql, (search_pattern,))
-    return row[0]["total"] if row else 0
+def _order_by_ids(rows: list[dict], film_ids: list[int]) -> list[dict]:
+    """Расставляет строки в порядке списка film_ids"""
+    by_id = {row["film_id"]: row for row in rows}
+    return [by_id[film_id] for film_id in film_ids if film_id in by_id]
 
 
-def count_films_by_actor(full_name: str, **kwargs) -> int:
-    """Подсчитывает количество фильмов по имени актера"""
-    sql = """
+def _keyword_page_ids(index: TitleIndex, keyword: str, limit: int, offset: int,
+                      after: tuple[int, int] | None, sort: str) -> list[int]:
+    """ID страницы результатов поиска по названию"""
+    if after is not None:
+        return index.search_after(keyword, after, limit)
+    return index.search(keyword, sort=sort)[offset:offset + limit]
+
+
+def _actor_films_query(actor_ids: tuple[int, ...], limit: int, offset: int) -> tuple[str, tuple]:
+    sql = f"""
+          SELECT f.film_id, 
+                 f.title, 
+                 f.release_year, 
+                 f.length, 
+                 f.rating, 
+                 '/static/images/no-poster.svg' AS poster_url,
+                 fa.actor_id
+          FROM film_actor AS fa
+          JOIN film AS f
+          ON f.film_id = fa.film_id
+          WHERE fa.actor_id IN ({_in_placeholders(actor_ids)})
+          ORDER BY f.release_year DESC, f.film_id DESC
+          LIMIT %s 
+          OFFSET %s; 
+          """
+    return sql, (*actor_ids, limit, offset)
+
+
+def _actor_films_count_query(actor_ids: tuple[int, ...]) -> tuple[str, tuple]:
+    # Считается по первичному ключу film_actor (actor_id, film_id) без соединения с film и actor
+    sql = f"""
         SELECT COUNT(*) AS total
-        FROM film AS f
-        JOIN film_actor AS fa ON fa.film_id = f.film_id
-        JOIN actor AS a ON a.actor_id = fa.actor_id
-        WHERE CONCAT(a.first_name, ' ', a.last_name) LIKE %s;
+        FROM film_actor
+        WHERE actor_id IN ({_in_placeholders(actor_ids)});
     """
-    row = query_all(sql, (f"%{full_name}%",))
-    return row[0]["total"] if row else 0
+    return sql, actor_ids
 
 
-def count_films_by_genres_year_range(category_id: int, year_from: int, year_to: int) -> int:
-    """Подсчитывает количество фильмов по жанру и диапазону лет"""
+def _attach_actor_names(films: list[dict], index: ActorIndex) -> list[dict]:
+    for film in films:
+        film["actor_name"] = index.display_name(film.pop("actor_id"))
+    return films
+
+
+def _genres_year_range_count_query(category_id: int, year_from: int, year_to: int) -> tuple[str, tuple]:
     sql = """
         SELECT COUNT(*) AS total
         FROM film AS f
         JOIN film_category AS fc ON fc.film_id = f.film_id
         WHERE fc.category_id = %s AND f.release_year BETWEEN %s AND %s;
     """
-    row = query_all(sql, (category_id, year_from, year_to))
-    return row[0]["total"] if row else 0
+    return sql, (category_id, year_from, year_to)
 
 
-def count_films_by_year(year: int) -> int:
-    """Подсчитывает количество фильмов за конкретный год"""
+def _year_count_query(year: int) -> tuple[str, tuple]:
     sql = """
         SELECT COUNT(*) AS total
         FROM film
         WHERE release_year = %s;
     """
-    row = query_all(sql, (year,))
-    return row[0]["total"] if row else 0
+    return sql, (year,)
 
 
-def count_films_by_year_range(year_from: int, year_to: int, category_id: int | None = None) -> int:
-    """Подсчитывает количество фильмов в диапазоне лет с опциональным фильтром жанра"""
+def _year_range_count_query(year_from: int, year_to: int, category_id: int | None) -> tuple[str, tuple]:
     if category_id is not None:
         sql = """
             SELECT COUNT(*) AS total
@@ -181,85 +306,68 @@ def count_films_by_year_range(year_from: int, year_to: int, category_id: int | N
             JOIN film_category AS fc ON fc.film_id = f.film_id
             WHERE f.release_year BETWEEN %s AND %s AND fc.category_id = %s;
         """
-        row = query_all(sql, (year_from, year_to, category_id))
-    else:
-        sql = """
-            SELECT COUNT(*) AS total
-            FROM film
-            WHERE release_year BETWEEN %s AND %s;
-        """
-        row = query_all(sql, (year_from, year_to))
-    return row[0]["total"] if row else 0
+        return sql, (year_from, year_to, category_id)
+    sql = """
+        SELECT COUNT(*) AS total
+        FROM film
+        WHERE release_year BETWEEN %s AND %s;
+    """
+    return sql, (year_from, year_to)
 
 
-def get_films_by_year_range(
-    year_from: int,
-    year_to: int,
-    category_id: int | None = None,
-    limit: int = 10,
-    offset: int = 0
-) -> list[dict]:
-    """Получает фильмы в диапазоне лет с опциональным фильтром жанра"""
+def _year_range_query(year_from: int, year_to: int, category_id: int | None, limit: int, offset: int,
+                      after: tuple[int, int] | None) -> tuple[str, tuple]:
+    seek, seek_params = _seek_condition(after)
 
     if category_id is not None:
-        sql = """
+        sql = f"""
             SELECT f.film_id, f.title, f.release_year, f.length, f.rating,
                    '/static/images/no-poster.svg' AS poster_url
             FROM film AS f
             JOIN film_category AS fc ON fc.film_id = f.film_id
             WHERE f.release_year BETWEEN %s AND %s
               AND fc.category_id = %s
+              AND {seek}
             ORDER BY f.release_year DESC, f.film_id DESC
             LIMIT %s OFFSET %s;
         """
-        return query_all(sql, (year_from, year_to, category_id, limit, offset))
+        return sql, (year_from, year_to, category_id, *seek_params, limit, offset)
 
 
-    sql = """
-        SELECT film_id, title, release_year, length, rating,
+    sql = f"""
+        SELECT f.film_id, f.title, f.release_year, f.length, f.rating,
                '/static/images/no-poster.svg' AS poster_url
-        FROM film
-        WHERE release_year BETWEEN %s AND %s
-        ORDER BY release_year DESC, film_id DESC
+        FROM film AS f
+        WHERE f.release_year BETWEEN %s AND %s
+          AND {seek}
+        ORDER BY f.release_year DESC, f.film_id DESC
         LIMIT %s OFFSET %s;
     """
-    return query_all(sql, (year_from, year_to, limit, offset))
+    return sql, (year_from, year_to, *seek_params, limit, offset)
 
 
-def get_all_genres()->list[dict]:
-    """Получает список всех жанров"""
+def _all_genres_query() -> tuple[str, tuple]:
     sql = """
           SELECT category_id, name, '/static/images/no-poster.svg' AS poster_url 
           FROM category
           ORDER BY name;
           """
-    return query_all(sql)
+    return sql, ()
 
 
-def get_years()->list[dict]:
-    """Получает минимальный и максимальный год выпуска фильмов"""
+def _years_query() -> tuple[str, tuple]:
     sql = """
     SELECT MIN(release_year) AS min_year,
     MAX(release_year) AS max_year
     FROM film;
      """
-    return query_all(sql)
+    return sql, ()
 
 
-def search_films_by_year(year: int, offset: int = 0, limit: int = 10) -> list[dict]:
-    """Поиск фильмов по конкретному году"""
-    sql = """
-        SELECT film_id, title, release_year, rating, length
-        FROM film
-        WHERE release_year = %s
-        ORDER BY rating DESC
-        LIMIT %s OFFSET %s
-    """
-    return query_all(sql, params=(year, limit, offset))
-
-def get_title_year_genres(category_id:int, year_from:int, year_to:int,limit:int = 10, offset:int = 0)->list[dict]:
-    """Получает фильмы по жанру и диапазону лет"""
-    sql = """
+def _title_year_genres_query(category_id: int, year_from: int, year_to: int, limit: int, offset: int,
+                             after: tuple[int, int] | None) -> tuple[str, tuple]:
+    seek, seek_params = _seek_condition(after)
+    sql = f"""
           SELECT f.film_id, f.title, f.release_year, f.length, f.rating, c.name as genre, '/static/images/no-poster.svg' AS poster_url
           FROM film as f
           JOIN film_category as fc
@@ -268,14 +376,14 @@ def get_title_year_genres(category_id:int, year_from:int, year_to:int,limit:int
           on c.category_id = fc.category_id
           WHERE fc.category_id = %s
           AND f.release_year BETWEEN %s AND %s
+          AND {seek}
           ORDER BY f.release_year DESC, f.film_id DESC
           LIMIT %s OFFSET %s;
           """
-    return query_all(sql,(category_id, year_from, year_to, limit, offset))
+    return sql, (category_id, year_from, year_to, *seek_params, limit, offset)
 
 
-def get_films_by_year(year: int, limit: int = 10, offset: int = 0) -> list[dict]:
-    """Получает фильмы за конкретный год"""
+def _films_by_year_query(year: int, limit: int, offset: int) -> tuple[str, tuple]:
     sql = """
         SELECT film_id, title, release_year, length, rating, '/static/images/no-poster.svg' AS poster_url
         FROM film
@@ -283,92 +391,30 @@ def get_films_by_year(year: int, limit: int = 10, offset: int = 0) -> list[dict]
         ORDER BY release_year DESC, film_id DESC
         LIMIT %s OFFSET %s;
     """
-    return query_all(sql, (year, limit, offset))
+    return sql, (year, limit, offset)
 
 
-def get_new_films(limit: int = 10, offset: int = 0) -> list[dict]:
-    """Получает новинки фильмов (за последние 5 лет)"""
-    # Define "new" as films from the last 5 years
-    current_year = 2025  # Could be dynamic, but using fixed year for consistency
-    min_year = current_year - 5  # Films from 2020 onwards
-    
-    sql = """
-        SELECT f.film_id, f.title, f.release_year, f.length, f.rating, '/static/images/no-poster.svg' AS poster_url,
-               GROUP_CONCAT(DISTINCT c.name ORDER BY c.name SEPARATOR ', ') AS genres
+def _new_films_query(limit: int, offset: int, after: tuple[int, int] | None) -> tuple[str, tuple]:
+    seek, seek_params = _seek_condition(after)
+    sql = f"""
+        SELECT f.film_id, f.title, f.release_year, f.length, f.rating, '/static/images/no-poster.svg' AS poster_url
         FROM film f
-        LEFT JOIN film_category fc ON f.film_id = fc.film_id
-        LEFT JOIN category c ON fc.category_id = c.category_id
-        WHERE f.release_year >= %s
-        GROUP BY f.film_id, f.title, f.release_year, f.length, f.rating
+        WHERE f.release_year >= %s AND {seek}
         ORDER BY f.release_year DESC, f.film_id DESC
         LIMIT %s OFFSET %s;
     """
-    return query_all(sql, (min_year, limit, offset))
-
-
-def get_new_films_count() -> int:
-    """Получает количество новинок фильмов (за последние 5 лет)"""
-    # Define "new" as films from the last 5 years
-    current_year = 2025  # Could be dynamic, but using fixed year for consistency
-    min_year = current_year - 5  # Films from 2020 onwards
-    
-    sql = "SELECT COUNT(*) AS total FROM film WHERE release_year >= %s;"
-    row = query_all(sql, (min_year,))
-    return row[0]["total"] if row else 0
+    return sql, (_new_films_min_year(), *seek_params, limit, offset)
 
 
-def search_films_by_actor(full_name:str,limit:int = 10, offset:int = 0)->list[dict]:
-    """Поиск фильмов по имени актера"""
-    sql = """
-          SELECT f.film_id, 
-                 f.title, 
-                 f.release_year, 
-                 f.length, 
-                 f.rating, 
-                 '/static/images/no-poster.svg' AS poster_url
-          , CONCAT(a.first_name, ' ', a.last_name) AS actor_name
-          FROM film AS f
-          JOIN film_actor AS fa
-          ON fa.film_id = f.film_id
-          JOIN actor AS a
-          ON a.actor_id = fa.actor_id
-          WHERE CONCAT(a.first_name, ' ', a.last_name) LIKE %s
-          ORDER BY f.release_year DESC, f.film_id DESC
-          LIMIT %s 
-          OFFSET %s; 
-          """
-
-    pattern = f"%{full_name}%"
-    return query_all(sql, (pattern, limit, offset))
+def _new_films_count_query() -> tuple[str, tuple]:
+    return "SELECT COUNT(*) AS total FROM film WHERE release_year >= %s;", (_new_films_min_year(),)
 
 
-def get_popular_films(limit: int = 10, offset: int = 0) -> list[dict]:
-    """Получает популярные фильмы (сортировка по количеству аренды)"""
+def _top_rated_query(limit: int, offset: int) -> tuple[str, tuple]:
     sql = """
-        SELECT f.film_id, f.title, f.release_year, f.length, f.rating, '/static/images/no-poster.svg' AS poster_url,
-               GROUP_CONCAT(DISTINCT c.name ORDER BY c.name SEPARATOR ', ') AS genres
+        SELECT f.film_id, f.title, f.release_year, f.length, f.rating, '/static/images/no-poster.svg' AS poster_url
         FROM film f
-        LEFT JOIN inventory i ON f.film_id = i.film_id
-        LEFT JOIN rental r ON i.inventory_id = r.inventory_id
-        LEFT JOIN film_category fc ON f.film_id = fc.film_id
-        LEFT JOIN category c ON fc.category_id = c.category_id
-        GROUP BY f.film_id, f.title, f.release_year, f.length, f.rating
-        ORDER BY COUNT(r.rental_id) DESC, f.release_year DESC, f.film_id DESC
-        LIMIT %s OFFSET %s;
-    """
-    return query_all(sql, (limit, offset))
-
-
-def get_top_rated_films(limit: int = 10, offset: int = 0) -> list[dict]:
-    """Получает фильмы с высокими рейтингами (G, PG, PG-13)"""
-    sql = """
-        SELECT f.film_id, f.title, f.release_year, f.length, f.rating, '/static/images/no-poster.svg' AS poster_url,
-               GROUP_CONCAT(DISTINCT c.name ORDER BY c.name SEPARATOR ', ') AS genres
-        FROM film f
-        LEFT JOIN film_category fc ON f.film_id = fc.film_id
-        LEFT JOIN category c ON fc.category_id = c.category_id
         WHERE f.rating IN ('G', 'PG', 'PG-13')
-        GROUP BY f.film_id, f.title, f.release_year, f.length, f.rating
         ORDER BY 
             CASE f.rating
                 WHEN 'G' THEN 1
@@ -379,33 +425,200 @@ def get_top_rated_films(limit: int = 10, offset: int = 0) -> list[dict]:
             f.release_year DESC, f.film_id DESC
         LIMIT %s OFFSET %s;
     """
-    return query_all(sql, (limit, offset))
+    return sql, (limit, offset)
 
 
-def get_random_films(limit: int = 10) -> list[dict]:
-    """Получает случайные фильмы"""
+def _top_rated_count_query() -> tuple[str, tuple]:
+    return "SELECT COUNT(*) AS total FROM film WHERE rating IN ('G', 'PG', 'PG-13');", ()
+
+
+def _random_ids(film_ids: tuple[int, ...], limit: int) -> list[int]:
+    # Выбираем случайные ID из кэша в памяти вместо ORDER BY RAND() по всему каталогу
+    return random.sample(film_ids, min(limit, len(film_ids)))
+
+
+def _total(rows: list[dict]) -> int:
+    return rows[0]["total"] if rows else 0
+
+
+def _cached_total(name: str, query: tuple[str, tuple]) -> int:
+    # Параметры запроса однозначно задаются аргументами функции, поэтому служат ключом
+    key = (name, query[1])
+    total = _counts.get(key)
+    if total is None:
+        total = _total(query_all(*query))
+        _counts.set(key, total)
+    return total
+
+
+# -----------------------------
+# Синхронный API
+# -----------------------------
+
+def get_films(limit: int = 10, offset:int = 0, after: tuple[int, int] | None = None)->list[dict]:
+    """Получает список фильмов с пагинацией"""
+    return attach_genres(query_all(*_films_query(limit, offset, after)))
+
+
+def get_films_count() -> int:
+    """Получает общее количество фильмов"""
+    return _cached_total("get_films_count", _films_count_query())
+
+
+def get_film_by_id(film_id: int) -> dict:
+    """Получает информацию о фильме по ID"""
+    result = query_all(*_film_by_id_query(film_id))
+    return result[0] if result else None
+
+
+def get_films_by_ids(film_ids: list[int]) -> list[dict]:
+    """Получает фильмы по списку ID, сохраняя порядок списка"""
+    if not film_ids:
+        return []
+    rows = query_all(*_films_by_ids_query(film_ids))
+    return attach_genres(_order_by_ids(rows, film_ids))
+
+
+def search_films_by_keyword(keyword:str, limit: int = 10, offset:int = 0,
+                            after: tuple[int, int] | None = None, sort: str = "relevance")->list[dict]:
+    """Поиск фильмов по ключевому слову в названии через индекс названий в памяти
+
+    Подходят слова названия, совпадающие со словами запроса целиком, по префиксу или по вхождению.
+    sort="relevance" ранжирует по релевантности, sort="newest" — по (release_year, film_id) DESC.
+    """
+    film_ids = _keyword_page_ids(_title_index.get(), keyword, limit, offset, after, sort)
+    # Из MySQL читаем только страницу по первичному ключу
+    return get_films_by_ids(film_ids)
+
+
+def count_films_by_keyword(keyword: str, **kwargs) -> int:
+    """Подсчитывает количество фильмов по ключевому слову"""
+    return len(_title_index.get().search(keyword))
+
+
+def count_films_by_actor(full_name: str, **kwargs) -> int:
+    """Подсчитывает количество фильмов по имени актера"""
+    actor_ids = _actor_index.get().match(full_name)
+    if not actor_ids:
+        return 0
+    return _cached_total("count_films_by_actor", _actor_films_count_query(actor_ids))
+
+
+def count_films_by_genres_year_range(category_id: int, year_from: int, year_to: int) -> int:
+    """Подсчитывает количество фильмов по жанру и диапазону лет"""
+    return _cached_total("count_films_by_genres_year_range",
+                         _genres_year_range_count_query(category_id, year_from, year_to))
+
+
+def count_films_by_year(year: int) -> int:
+    """Подсчитывает количество фильмов за конкретный год"""
+    return _cached_total("count_films_by_year", _year_count_query(year))
+
+
+def count_films_by_year_range(year_from: int, year_to: int, category_id: int | None = None) -> int:
+    """Подсчитывает количество фильмов в диапазоне лет с опциональным фильтром жанра"""
+    return _cached_total("count_films_by_year_range",
+                         _year_range_count_query(year_from, year_to, category_id))
+
+
+def get_films_by_year_range(
+    year_from: int,
+    year_to: int,
+    category_id: int | None = None,
+    limit: int = 10,
+    offset: int = 0,
+    after: tuple[int, int] | None = None
+) -> list[dict]:
+    """Получает фильмы в диапазоне лет с опциональным фильтром жанра"""
+    return query_all(*_year_range_query(year_from, year_to, category_id, limit, offset, after))
+
+
+def get_all_genres()->list[dict]:
+    """Получает список всех жанров"""
+    return query_all(*_all_genres_query())
+
+
+def get_years()->list[dict]:
+    """Получает минимальный и максимальный год выпуска фильмов"""
+    return query_all(*_years_query())
+
+
+def search_films_by_year(year: int, offset: int = 0, limit: int = 10) -> list[dict]:
+    """Поиск фильмов по конкретному году"""
     sql = """
-        SELECT f.film_id, f.title, f.release_year, f.length, f.rating, '/static/images/no-poster.svg' AS poster_url,
-               GROUP_CONCAT(DISTINCT c.name ORDER BY c.name SEPARATOR ', ') AS genres
-        FROM film f
-        LEFT JOIN film_category fc ON f.film_id = fc.film_id
-        LEFT JOIN category c ON fc.category_id = c.category_id
-        GROUP BY f.film_id, f.title, f.release_year, f.length, f.rating
-        ORDER BY RAND()
-        LIMIT %s;
+        SELECT film_id, title, release_year, rating, length
+        FROM film
+        WHERE release_year = %s
+        ORDER BY rating DESC
+        LIMIT %s OFFSET %s
+    """
+    return query_all(sql, params=(year, limit, offset))
+
+def get_title_year_genres(category_id:int, year_from:int, year_to:int,limit:int = 10, offset:int = 0,
+                          after: tuple[int, int] | None = None)->list[dict]:
+    """Получает фильмы по жанру и диапазону лет"""
+    return query_all(*_title_year_genres_query(category_id, year_from, year_to, limit, offset, after))
+
+
+def get_films_by_year(year: int, limit: int = 10, offset: int = 0) -> list[dict]:
+    """Получает фильмы за конкретный год"""
+    return query_all(*_films_by_year_query(year, limit, offset))
+
+
+def get_new_films(limit: int = 10, offset: int = 0, after: tuple[int, int] | None = None) -> list[dict]:
+    """Получает новинки фильмов (за последние 5 лет)"""
+    return attach_genres(query_all(*_new_films_query(limit, offset, after)))
+
+
+def get_new_films_count() -> int:
+    """Получает количество новинок фильмов (за последние 5 лет)"""
+    return _cached_total("get_new_films_count", _new_films_count_query())
+
+
+def search_films_by_actor(full_name:str,limit:int = 10, offset:int = 0)->list[dict]:
+    """Поиск фильмов по имени актера
+
+    Сначала имя разрешается в actor_id через индекс имён в памяти,
+    затем фильмы выбираются по actor_id через первичный ключ film_actor.
     """
-    return query_all(sql, (limit,))
+    index = _actor_index.get()
+    actor_ids = index.match(full_name)
+    if not actor_ids:
+        return []
+    films = query_all(*_actor_films_query(actor_ids, limit, offset))
+    return _attach_actor_names(films, index)
+
+
+def get_popular_films(limit: int = 10, offset: int = 0) -> list[dict]:
+    """Получает популярные фильмы (сортировка по количеству аренды)"""
+    # Порядок берётся из рейтинга в памяти, из MySQL читается только страница
+    return get_films_by_ids(_popularity.get().page(limit, offset))
+
+
+def get_top_rated_films(limit: int = 10, offset: int = 0) -> list[dict]:
+    """Получает фильмы с высокими рейтингами (G, PG, PG-13)"""
+    return attach_genres(query_all(*_top_rated_query(limit, offset)))
+
+
+def get_random_films(limit: int = 10) -> list[dict]:
+    """Получает случайные фильмы"""
+    return get_films_by_ids(_random_ids(_film_ids.get(), limit))
+
+
+def get_catalog_by_popularity() -> list[dict]:
+    """film_id и названия всех фильмов: сначала популярные, затем по новизне (порядок прогрева постеров)"""
+    ranking = _popularity.get()
+    films = {row["film_id"]: row for row in query_all("SELECT film_id, title FROM film;")}
+    ranked = [films.pop(film_id) for film_id in ranking.page(len(ranking)) if film_id in films]
+    # Фильмы, появившиеся после последнего обновления рейтинга
+    return ranked + list(films.values())
 
 
 def get_popular_films_count() -> int:
     """Получает общее количество популярных фильмов"""
-    sql = "SELECT COUNT(*) AS total FROM film;"
-    row = query_all(sql)
-    return row[0]["total"] if row else 0
+    return len(_popularity.get())
 
 
 def get_top_rated_films_count() -> int:
     """Получает количество фильмов с высокими рейтингами"""
-    sql = "SELECT COUNT(*) AS total FROM film WHERE rating IN ('G', 'PG', 'PG-13');"
-    row = query_all(sql)
-    return row[0]["total"] if row else 0
+    return _cached_total("get_top_rated_films_count", _top_rated_count_query())
@@ -0,0 +1,222 @@
+# Асинхронный вариант API db/my_sql.py для обработчиков async def.
+# SQL-запросы и структуры в памяти (индексы, рейтинг, жанры) общие с синхронным модулем,
+# здесь запросы выполняются через асинхронный пул соединений mysql.connector.aio.
+import asyncio
+
+from settings import settings
+from db.pool import AsyncConnectionPool
+from db.snapshot import Snapshot
+from db.my_sql import (
+    _cfg,
+    _title_index,
+    _actor_index,
+    _popularity,
+    _film_ids,
+    _genre_map,
+    _counts,
+    _films_query,
+    _films_count_query,
+    _film_by_id_query,
+    _films_by_ids_query,
+    _order_by_ids,
+    _keyword_page_ids,
+    _actor_films_query,
+    _actor_films_count_query,
+    _attach_actor_names,
+    _genres_year_range_count_query,
+    _year_count_query,
+    _year_range_count_query,
+    _year_range_query,
+    _all_genres_query,
+    _years_query,
+    _title_year_genres_query,
+    _films_by_year_query,
+    _new_films_query,
+    _new_films_count_query,
+    _top_rated_query,
+    _top_rated_count_query,
+    _random_ids,
+    _total,
+)
+
+_pool = AsyncConnectionPool(
+    _cfg,
+    size=settings.MYSQL_POOL_SIZE,
+    max_overflow=settings.MYSQL_POOL_MAX_OVERFLOW,
+    recycle=settings.MYSQL_POOL_RECYCLE,
+    timeout=settings.MYSQL_POOL_TIMEOUT,
+    pre_ping=settings.MYSQL_POOL_PRE_PING,
+)
+
+
+async def query_all(sql: str, params: tuple = ()) -> list[dict]:
+    """Выполняет SQL запрос и возвращает результат в виде списка словарей"""
+    async with _pool.connection() as conn:
+        async with await conn.cursor(dictionary=True) as cursor:
+            await cursor.execute(sql, params)
+            return await cursor.fetchall()
+
+
+def get_pool_stats() -> dict:
+    """Возвращает счётчики асинхронного пула соединений MySQL"""
+    return _pool.stats()
+
+
+async def close_pool() -> None:
+    """Закрывает соединения асинхронного пула при остановке приложения"""
+    await _pool.close()
+
+
+async def _current(snapshot: Snapshot):
+    """Значение снимка; перестроение (синхронные запросы) выполняется вне цикла событий"""
+    if snapshot.is_fresh():
+        return snapshot.get()
+    return await asyncio.to_thread(snapshot.get)
+
+
+async def _cached_total(name: str, query: tuple[str, tuple]) -> int:
+    key = (name, query[1])
+    total = _counts.get(key)
+    if total is None:
+        total = _total(await query_all(*query))
+        _counts.set(key, total)
+    return total
+
+
+async def attach_genres(films: list[dict]) -> list[dict]:
+    """Добавляет жанры к уже выбранной странице фильмов"""
+    return (await _current(_genre_map)).attach(films)
+
+
+async def get_films(limit: int = 10, offset: int = 0, after: tuple[int, int] | None = None) -> list[dict]:
+    """Получает список фильмов с пагинацией"""
+    return await attach_genres(await query_all(*_films_query(limit, offset, after)))
+
+
+async def get_films_count() -> int:
+    """Получает общее количество фильмов"""
+    return await _cached_total("get_films_count", _films_count_query())
+
+
+async def get_film_by_id(film_id: int) -> dict:
+    """Получает информацию о фильме по ID"""
+    result = await query_all(*_film_by_id_query(film_id))
+    return result[0] if result else None
+
+
+async def get_films_by_ids(film_ids: list[int]) -> list[dict]:
+    """Получает фильмы по списку ID, сохраняя порядок списка"""
+    if not film_ids:
+        return []
+    rows = await query_all(*_films_by_ids_query(film_ids))
+    return await attach_genres(_order_by_ids(rows, film_ids))
+
+
+async def search_films_by_keyword(keyword: str, limit: int = 10, offset: int = 0,
+                                  after: tuple[int, int] | None = None, sort: str = "relevance") -> list[dict]:
+    """Поиск фильмов по ключевому слову в названии через индекс названий в памяти"""
+    index = await _current(_title_index)
+    return await get_films_by_ids(_keyword_page_ids(index, keyword, limit, offset, after, sort))
+
+
+async def count_films_by_keyword(keyword: str, **kwargs) -> int:
+    """Подсчитывает количество фильмов по ключевому слову"""
+    return len((await _current(_title_index)).search(keyword))
+
+
+async def search_films_by_actor(full_name: str, limit: int = 10, offset: int = 0) -> list[dict]:
+    """Поиск фильмов по имени актера"""
+    index = await _current(_actor_index)
+    actor_ids = index.match(full_name)
+    if not actor_ids:
+        return []
+    films = await query_all(*_actor_films_query(actor_ids, limit, offset))
+    return _attach_actor_names(films, index)
+
+
+async def count_films_by_actor(full_name: str, **kwargs) -> int:
+    """Подсчитывает количество фильмов по имени актера"""
+    actor_ids = (await _current(_actor_index)).match(full_name)
+    if not actor_ids:
+        return 0
+    return await _cached_total("count_films_by_actor", _actor_films_count_query(actor_ids))
+
+
+async def get_title_year_genres(category_id: int, year_from: int, year_to: int, limit: int = 10, offset: int = 0,
+                                after: tuple[int, int] | None = None) -> list[dict]:
+    """Получает фильмы по жанру и диапазону лет"""
+    return await query_all(*_title_year_genres_query(category_id, year_from, year_to, limit, offset, after))
+
+
+async def count_films_by_genres_year_range(category_id: int, year_from: int, year_to: int) -> int:
+    """Подсчитывает количество фильмов по жанру и диапазону лет"""
+    return await _cached_total("count_films_by_genres_year_range",
+                               _genres_year_range_count_query(category_id, year_from, year_to))
+
+
+async def get_films_by_year(year: int, limit: int = 10, offset: int = 0) -> list[dict]:
+    """Получает фильмы за конкретный год"""
+    return await query_all(*_films_by_year_query(year, limit, offset))
+
+
+async def count_films_by_year(year: int) -> int:
+    """Подсчитывает количество фильмов за конкретный год"""
+    return await _cached_total("count_films_by_year", _year_count_query(year))
+
+
+async def get_films_by_year_range(year_from: int, year_to: int, category_id: int | None = None,
+                                  limit: int = 10, offset: int = 0,
+                                  after: tuple[int, int] | None = None) -> list[dict]:
+    """Получает фильмы в диапазоне лет с опциональным фильтром жанра"""
+    return await query_all(*_year_range_query(year_from, year_to, category_id, limit, offset, after))
+
+
+async def count_films_by_year_range(year_from: int, year_to: int, category_id: int | None = None) -> int:
+    """Подсчитывает количество фильмов в диапазоне лет с опциональным фильтром жанра"""
+    return await _cached_total("count_films_by_year_range",
+                               _year_range_count_query(year_from, year_to, category_id))
+
+
+async def get_all_genres() -> list[dict]:
+    """Получает список всех жанров"""
+    return await query_all(*_all_genres_query())
+
+
+async def get_years() -> list[dict]:
+    """Получает минимальный и максимальный год выпуска фильмов"""
+    return await query_all(*_years_query())
+
+
+async def get_new_films(limit: int = 10, offset: int = 0, after: tuple[int, int] | None = None) -> list[dict]:
+    """Получает новинки фильмов (за последние 5 лет)"""
+    return await attach_genres(await query_all(*_new_films_query(limit, offset, after)))
+
+
+async def get_new_films_count() -> int:
+    """Получает количество новинок фильмов (за последние 5 лет)"""
+    return await _cached_total("get_new_films_count", _new_films_count_query())
+
+
+async def get_popular_films(limit: int = 10, offset: int = 0) -> list[dict]:
+    """Получает популярные фильмы (сортировка по количеству аренды)"""
+    return await get_films_by_ids((await _current(_popularity)).page(limit, offset))
+
+
+async def get_popular_films_count() -> int:
+    """Получает общее количество популярных фильмов"""
+    return len(await _current(_popularity))
+
+
+async def get_top_rated_films(limit: int = 10, offset: int = 0) -> list[dict]:
+    """Получает фильмы с высокими рейтингами (G, PG, PG-13)"""
+    return await attach_genres(await query_all(*_top_rated_query(limit, offset)))
+
+
+async def get_top_rated_films_count() -> int:
+    """Получает количество фильмов с высокими рейтингами"""
+    return await _cached_total("get_top_rated_films_count", _top_rated_count_query())
+
+
+async def get_random_films(limit: int = 10) -> list[dict]:
+    """Получает случайные фильмы"""
+    return await get_films_by_ids(_random_ids(await _current(_film_ids), limit))
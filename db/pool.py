@@ -0,0 +1,295 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+import mysql.connector
+import mysql.connector.aio
+from mysql.connector.errors import InterfaceError, OperationalError, PoolError
+
+
+class _PoolBase:
+    """Общие параметры и счётчики синхронного и асинхронного пулов"""
+
+    def __init__(self, config: dict, size: int = 5, max_overflow: int = 10,
+                 recycle: float = 1800, timeout: float = 10, pre_ping: bool = True):
+        self._config = config
+        self.size = size
+        self.max_overflow = max_overflow
+        self.recycle = recycle
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+
+        # Простаивающие соединения: (connection, время возврата в пул)
+        self._idle: deque = deque()
+        self._opened = 0
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+            "exhausted": 0,
+            "created": 0,
+            "recycled": 0,
+            "ping_failures": 0,
+            "discarded": 0,
+        }
+
+    def _exhausted_error(self) -> PoolError:
+        return PoolError(
+            f"MySQL pool exhausted: {self._opened} connections in use, "
+            f"timeout {self.timeout}s"
+        )
+
+    def _needs_recycle(self, returned_at: float) -> bool:
+        return bool(self.recycle) and time.monotonic() - returned_at > self.recycle
+
+    def _snapshot(self) -> dict:
+        idle = len(self._idle)
+        return {
+            **self._stats,
+            "size": self.size,
+            "max_overflow": self.max_overflow,
+            "opened": self._opened,
+            "idle": idle,
+            "in_use": self._opened - idle,
+        }
+
+
+class ConnectionPool(_PoolBase):
+    """Пул соединений MySQL с overflow, переподключением простаивающих соединений и счётчиками"""
+
+    def __init__(self, config: dict, **kwargs):
+        super().__init__(config, **kwargs)
+        self._cond = threading.Condition()
+
+    def _connect(self):
+        conn = mysql.connector.connect(**self._config)
+        # Пул отдаёт соединения только для чтения — autocommit не даёт держать старый снимок REPEATABLE READ
+        conn.autocommit = True
+        return conn
+
+    @staticmethod
+    def _close(conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_alive(self, conn) -> bool:
+        try:
+            return conn.is_connected()
+        except Exception:
+            return False
+
+    def _checkout(self):
+        """Забирает соединение из пула, при необходимости ожидая освобождения"""
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        wait_started = 0.0
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    break
+                if self._opened < self.size + self.max_overflow:
+                    self._opened += 1
+                    conn, returned_at = None, None
+                    break
+                if not waited:
+                    waited = True
+                    wait_started = time.monotonic()
+                    self._stats["waits"] += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["exhausted"] += 1
+                    self._stats["wait_seconds"] += time.monotonic() - wait_started
+                    raise self._exhausted_error()
+                self._cond.wait(remaining)
+            if waited:
+                self._stats["wait_seconds"] += time.monotonic() - wait_started
+            self._stats["checkouts"] += 1
+
+        # Сетевые операции выполняются вне блокировки
+        try:
+            if conn is not None and self._needs_recycle(returned_at):
+                self._close(conn)
+                conn = None
+                self._count("recycled")
+            if conn is not None and self.pre_ping and not self._is_alive(conn):
+                self._close(conn)
+                conn = None
+                self._count("ping_failures")
+            if conn is None:
+                conn = self._connect()
+                self._count("created")
+        except Exception:
+            self._release_slot()
+            raise
+        return conn
+
+    def _checkin(self, conn, broken: bool = False) -> None:
+        """Возвращает соединение в пул; лишние и сломанные соединения закрываются"""
+        with self._cond:
+            if not broken and len(self._idle) < self.size:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+                return
+            self._opened -= 1
+            self._stats["discarded"] += 1
+            self._cond.notify()
+        self._close(conn)
+
+    def _release_slot(self) -> None:
+        with self._cond:
+            self._opened -= 1
+            self._cond.notify()
+
+    def _count(self, key: str) -> None:
+        with self._cond:
+            self._stats[key] += 1
+
+    @contextmanager
+    def connection(self):
+        """Контекстный менеджер: выдаёт соединение и возвращает его в пул"""
+        conn = self._checkout()
+        broken = False
+        try:
+            yield conn
+        except (InterfaceError, OperationalError):
+            # Соединение могло оборваться — в пул его не возвращаем
+            broken = True
+            raise
+        finally:
+            self._checkin(conn, broken=broken)
+
+    def stats(self) -> dict:
+        """Снимок счётчиков пула"""
+        with self._cond:
+            return self._snapshot()
+
+    def close(self) -> None:
+        """Закрывает все простаивающие соединения"""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._opened -= len(idle)
+        for conn, _ in idle:
+            self._close(conn)
+
+
+class AsyncConnectionPool(_PoolBase):
+    """Асинхронный вариант ConnectionPool поверх mysql.connector.aio
+
+    Используется из одного цикла событий, поэтому счётчики меняются без блокировок.
+    """
+
+    def __init__(self, config: dict, **kwargs):
+        super().__init__(config, **kwargs)
+        self._cond = asyncio.Condition()
+
+    async def _connect(self):
+        conn = await mysql.connector.aio.connect(**self._config)
+        await conn.set_autocommit(True)
+        return conn
+
+    @staticmethod
+    async def _close(conn) -> None:
+        try:
+            await conn.close()
+        except Exception:
+            pass
+
+    async def _is_alive(self, conn) -> bool:
+        try:
+            return await conn.is_connected()
+        except Exception:
+            return False
+
+    async def _checkout(self):
+        """Забирает соединение из пула, при необходимости ожидая освобождения"""
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        wait_started = 0.0
+        async with self._cond:
+            while True:
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    break
+                if self._opened < self.size + self.max_overflow:
+                    self._opened += 1
+                    conn, returned_at = None, None
+                    break
+                if not waited:
+                    waited = True
+                    wait_started = time.monotonic()
+                    self._stats["waits"] += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["exhausted"] += 1
+                    self._stats["wait_seconds"] += time.monotonic() - wait_started
+                    raise self._exhausted_error()
+                try:
+                    await asyncio.wait_for(self._cond.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+            if waited:
+                self._stats["wait_seconds"] += time.monotonic() - wait_started
+            self._stats["checkouts"] += 1
+
+        try:
+            if conn is not None and self._needs_recycle(returned_at):
+                await self._close(conn)
+                conn = None
+                self._stats["recycled"] += 1
+            if conn is not None and self.pre_ping and not await self._is_alive(conn):
+                await self._close(conn)
+                conn = None
+                self._stats["ping_failures"] += 1
+            if conn is None:
+                conn = await self._connect()
+                self._stats["created"] += 1
+        except BaseException:
+            async with self._cond:
+                self._opened -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    async def _checkin(self, conn, broken: bool = False) -> None:
+        """Возвращает соединение в пул; лишние и сломанные соединения закрываются"""
+        async with self._cond:
+            if not broken and len(self._idle) < self.size:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+                return
+            self._opened -= 1
+            self._stats["discarded"] += 1
+            self._cond.notify()
+        await self._close(conn)
+
+    @asynccontextmanager
+    async def connection(self):
+        """Асинхронный контекстный менеджер: выдаёт соединение и возвращает его в пул"""
+        conn = await self._checkout()
+        broken = False
+        try:
+            yield conn
+        except (InterfaceError, OperationalError, asyncio.CancelledError):
+            # Оборванное или прерванное на середине соединение в пул не возвращаем
+            broken = True
+            raise
+        finally:
+            await self._checkin(conn, broken=broken)
+
+    def stats(self) -> dict:
+        """Снимок счётчиков пула"""
+        return self._snapshot()
+
+    async def close(self) -> None:
+        """Закрывает все простаивающие соединения"""
+        idle = list(self._idle)
+        self._idle.clear()
+        self._opened -= len(idle)
+        for conn, _ in idle:
+            await self._close(conn)
@@ -0,0 +1,34 @@
+class PopularityRanking:
+    """Рейтинг фильмов по числу аренд
+
+    Хранит накопленные счётчики по film_id и последний учтённый rental_id,
+    поэтому следующее обновление читает только новые записи rental.
+    """
+
+    def __init__(self, films: list[dict], counts: dict[int, int], last_rental_id: int):
+        self.counts = counts
+        self.last_rental_id = last_rental_id
+        # Тот же порядок, что и ORDER BY COUNT(r.rental_id) DESC, f.release_year DESC, f.film_id DESC
+        self._ranked = [
+            film_id for _, _, film_id in sorted(
+                ((counts.get(f["film_id"], 0), f["release_year"] or 0, f["film_id"]) for f in films),
+                reverse=True,
+            )
+        ]
+
+    @classmethod
+    def updated(cls, previous: "PopularityRanking | None", films: list[dict], deltas: list[dict]) -> "PopularityRanking":
+        """Новая версия рейтинга: предыдущие счётчики плюс аренды, появившиеся с прошлого обновления"""
+        counts = dict(previous.counts) if previous else {}
+        last_rental_id = previous.last_rental_id if previous else 0
+        for row in deltas:
+            counts[row["film_id"]] = counts.get(row["film_id"], 0) + row["rentals"]
+            last_rental_id = max(last_rental_id, row["last_rental_id"])
+        return cls(films, counts, last_rental_id)
+
+    def __len__(self) -> int:
+        return len(self._ranked)
+
+    def page(self, limit: int, offset: int = 0) -> list[int]:
+        """film_id страницы рейтинга"""
+        return self._ranked[offset:offset + limit]
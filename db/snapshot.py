@@ -0,0 +1,110 @@
+import threading
+import time
+
+# Все созданные снимки — для отдачи их состояния в /meta/metrics
+_registry: list["Snapshot"] = []
+
+
+class Snapshot:
+    """Структура данных в памяти, построенная из MySQL и перестраиваемая по истечении TTL
+
+    loader — функция без аргументов, возвращающая готовую структуру;
+    при incremental=True она получает предыдущую версию (или None) и дополняет её.
+    Пока идёт перестроение, остальные потоки получают предыдущую версию.
+    """
+
+    def __init__(self, name: str, loader, ttl: float, incremental: bool = False):
+        self.name = name
+        self._loader = loader
+        self.ttl = ttl
+        self.incremental = incremental
+        self._lock = threading.Lock()
+        self._value = None
+        self._built_at: float | None = None
+        self._refreshed_at: float | None = None
+        self._refresher: threading.Thread | None = None
+        self._stats = {
+            "builds": 0,
+            "errors": 0,
+            "last_build_seconds": 0.0,
+        }
+        _registry.append(self)
+
+    def _expired(self) -> bool:
+        return self._built_at is None or (self.ttl and time.monotonic() - self._built_at > self.ttl)
+
+    def is_fresh(self) -> bool:
+        """True, если get() вернёт значение без перестроения"""
+        return self._value is not None and not self._expired()
+
+    def get(self):
+        """Возвращает актуальную структуру, перестраивая её при необходимости"""
+        if not self._expired():
+            return self._value
+        if self._value is None:
+            # Первое построение — ждём его все
+            with self._lock:
+                if self._value is None:
+                    self._rebuild()
+            return self._value
+        # Структура устарела — перестраивает один поток, остальные отдают старую версию
+        if self._lock.acquire(blocking=False):
+            try:
+                if self._expired():
+                    self._rebuild()
+            finally:
+                self._lock.release()
+        return self._value
+
+    def _rebuild(self) -> None:
+        started = time.monotonic()
+        try:
+            value = self._loader(self._value) if self.incremental else self._loader()
+        except Exception as e:
+            self._stats["errors"] += 1
+            print(f"Snapshot {self.name} rebuild error: {e}")
+            if self._value is None:
+                raise
+            # Оставляем старую версию, повторим после следующего TTL
+            self._built_at = time.monotonic()
+            return
+        self._value = value
+        self._built_at = self._refreshed_at = time.monotonic()
+        self._stats["builds"] += 1
+        self._stats["last_build_seconds"] = self._built_at - started
+
+    def refresh(self) -> None:
+        """Принудительно перестраивает структуру"""
+        with self._lock:
+            self._rebuild()
+
+    def start_refresher(self, interval: float) -> None:
+        """Запускает фоновый поток, перестраивающий структуру каждые interval секунд"""
+        if self._refresher is not None:
+            return
+
+        def run():
+            while True:
+                try:
+                    self.refresh()
+                except Exception:
+                    # Ошибка уже учтена в _rebuild, попробуем на следующем шаге
+                    pass
+                time.sleep(interval)
+
+        self._refresher = threading.Thread(target=run, name=f"snapshot-{self.name}", daemon=True)
+        self._refresher.start()
+
+    def invalidate(self) -> None:
+        """Помечает структуру устаревшей — она перестроится при следующем обращении"""
+        self._built_at = None
+
+    def stats(self) -> dict:
+        """Счётчики перестроений и возраст текущей версии"""
+        age = time.monotonic() - self._refreshed_at if self._refreshed_at is not None else None
+        return {**self._stats, "ttl": self.ttl, "age_seconds": age}
+
+
+def all_stats() -> dict:
+    """Состояние всех снимков по именам"""
+    return {snapshot.name: snapshot.stats() for snapshot in _registry}
@@ -0,0 +1,104 @@
+import math
+import re
+from bisect import bisect_left, bisect_right
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Веса совпадений: точное слово важнее префикса, префикс важнее вхождения внутри слова
+_EXACT_WEIGHT = 3.0
+_PREFIX_WEIGHT = 2.0
+_INFIX_WEIGHT = 1.0
+
+_RESULT_CACHE_SIZE = 256
+
+
+def tokenize(text: str) -> list[str]:
+    """Разбивает текст на слова в нижнем регистре"""
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+class TitleIndex:
+    """Инвертированный индекс названий фильмов: слово -> множество film_id"""
+
+    def __init__(self, rows: list[dict]):
+        # film_id -> (release_year, film_id) для сортировки «сначала новые»
+        self._order: dict[int, tuple[int, int]] = {}
+        self._postings: dict[str, set[int]] = {}
+        for row in rows:
+            film_id = row["film_id"]
+            self._order[film_id] = (row["release_year"] or 0, film_id)
+            for token in tokenize(row["title"]):
+                self._postings.setdefault(token, set()).add(film_id)
+        self._vocabulary = sorted(self._postings)
+        self._results: dict[tuple[str, str], list[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def _expand(self, term: str) -> list[tuple[str, float]]:
+        """Слова словаря, подходящие под term, с весом совпадения"""
+        matches = []
+        start = bisect_left(self._vocabulary, term)
+        end = start
+        while end < len(self._vocabulary) and self._vocabulary[end].startswith(term):
+            token = self._vocabulary[end]
+            matches.append((token, _EXACT_WEIGHT if token == term else _PREFIX_WEIGHT))
+            end += 1
+        # Вхождение в середину слова — сохраняет поведение прежнего LIKE '%kw%'
+        for i, token in enumerate(self._vocabulary):
+            if (i < start or i >= end) and term in token:
+                matches.append((token, _INFIX_WEIGHT))
+        return matches
+
+    def _score(self, terms: list[str]) -> dict[int, float]:
+        total = len(self._order) or 1
+        scores: dict[int, float] | None = None
+        for term in terms:
+            term_scores: dict[int, float] = {}
+            for token, weight in self._expand(term):
+                postings = self._postings[token]
+                score = weight * math.log(1 + total / len(postings))
+                for film_id in postings:
+                    if score > term_scores.get(film_id, 0.0):
+                        term_scores[film_id] = score
+            # Фильм должен содержать все слова запроса
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {fid: s + term_scores[fid] for fid, s in scores.items() if fid in term_scores}
+            if not scores:
+                break
+        return scores or {}
+
+    def search(self, query: str, sort: str = "relevance") -> list[int]:
+        """Возвращает film_id, подходящие под запрос
+
+        sort="relevance" — по убыванию релевантности, sort="newest" — по (release_year, film_id) DESC
+        """
+        terms = tokenize(query)
+        key = (" ".join(terms), sort)
+        cached = self._results.get(key)
+        if cached is not None:
+            return cached
+
+        if terms:
+            scores = self._score(terms)
+        else:
+            # Пустой запрос, как и LIKE '%%', подходит под все фильмы
+            scores = dict.fromkeys(self._order, 0.0)
+        if sort == "newest":
+            result = sorted(scores, key=self._order.__getitem__, reverse=True)
+        else:
+            result = sorted(scores, key=lambda fid: (scores[fid], self._order[fid]), reverse=True)
+
+        if len(self._results) >= _RESULT_CACHE_SIZE:
+            self._results.clear()
+        self._results[key] = result
+        return result
+
+    def search_after(self, query: str, after: tuple[int, int], limit: int) -> list[int]:
+        """Совпадения в порядке «сначала новые», строго после позиции after=(release_year, film_id)"""
+        ranked = self.search(query, sort="newest")
+        start = bisect_right(ranked, (-after[0], -after[1]),
+                             key=lambda fid: (-self._order[fid][0], -fid))
+        return ranked[start:start + limit]
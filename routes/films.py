@@ -1,5 +1,8 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+
 from fastapi import APIRouter, Query, HTTPException
-from db.my_sql import (
+from starlette.concurrency import run_in_threadpool
+from db.my_sql_async import (
     get_films as db_get_films,
     get_films_count,
     search_films_by_keyword as db_search_films_by_keyword,
@@ -20,12 +23,14 @@ from db.my_sql import (
     get_popular_films_count,
     get_top_rated_films,
     get_top_rated_films_count,
-    get_random_films
+    get_random_films,
+    get_films_by_ids
 )
 from utils.log_writer import log_search_keyword, log_films_id
-from utils.pagination import paginate
-from utils.tmdb import get_poster_by_title
+from utils.pagination import apaginate, InvalidCursor
+from utils.tmdb import NO_POSTER_URL, fetch_poster, lookup_posters
 from schemas import GenreListResponse, Genre
+from settings import settings
 
 
 
@@ -36,15 +41,46 @@ router = APIRouter(prefix='/films', tags=['films'])
 # Вспомогательная функция для добавления постеров
 # -----------------------------
 
+# Потоки для параллельных запросов постеров к TMDB — общие для всех запросов
+_poster_executor = ThreadPoolExecutor(
+    max_workers=settings.POSTER_WORKERS,
+    thread_name_prefix="posters",
+)
+
+
+def _list_poster_url(film: dict, poster_url: str) -> str:
+    """Для найденного постера отдаём миниатюру через локальный прокси /posters/{film_id}"""
+    if not settings.POSTER_PROXY or not poster_url.startswith("http") or film.get("film_id") is None:
+        return poster_url
+    return f"/posters/{film['film_id']}?size={settings.POSTER_LIST_SIZE}"
+
+
 def add_posters(films: list[dict]) -> list[dict]:
-    """Добавляет URL постеров к списку фильмов"""
-    for film in films:
+    """Добавляет URL постеров к списку фильмов
+
+    Вся страница проверяется по кэшу одной операцией. Промахи разрешаются параллельно;
+    по истечении POSTER_DEADLINE секунд оставшиеся фильмы получают заглушку,
+    а незавершённые запросы дозаполнят кэш в фоне.
+    """
+    resolved, to_fetch = lookup_posters(films)
+    futures = {
+        film["film_id"]: _poster_executor.submit(fetch_poster, film["film_id"], film["title"])
+        for film in to_fetch
+    }
+    done, not_done = wait(futures.values(), timeout=settings.POSTER_DEADLINE)
+    if not_done:
+        print(f"Poster deadline exceeded: {len(not_done)} of {len(futures)} films unresolved")
+    for film_id, future in futures.items():
+        if future not in done:
+            continue
         try:
-            poster_url = get_poster_by_title(film.get("title", ""))
-            film["poster_url"] = poster_url if poster_url else "/static/images/no-poster.svg"
+            resolved[film_id] = future.result()
         except Exception as e:
-            print(f"Error getting poster for {film.get('title', 'unknown')}: {e}")
-            film["poster_url"] = "/static/images/no-poster.svg"
+            print(f"Error getting poster for film {film_id}: {e}")
+
+    for film in films:
+        poster_url = resolved.get(film.get("film_id"))
+        film["poster_url"] = _list_poster_url(film, poster_url) if poster_url else NO_POSTER_URL
     return films
 
 
@@ -56,20 +92,25 @@ def add_posters_safe(films: list[dict]) -> list[dict]:
         print(f"Error adding posters: {e}")
         # Ensure all films have at least a default poster
         for film in films:
-            film["poster_url"] = "/static/images/no-poster.svg"
+            film["poster_url"] = NO_POSTER_URL
         return films
 
 
-def get_films_with_posters(fetch_items, fetch_total, limit: int, offset: int, **kwargs):
-    """Универсальная функция для получения фильмов с постерами"""
-    result = paginate(
+async def get_films_with_posters(fetch_items, fetch_total, limit: int, offset: int, posters: bool = True, **kwargs):
+    """Универсальная функция для получения фильмов с постерами
+
+    posters=False отдаёт список без обращения к TMDB — постеры клиент догружает через /films/posters
+    """
+    result = await apaginate(
         fetch_items=fetch_items,
         fetch_total=fetch_total,
         limit=limit,
         offset=offset,
         **kwargs
     )
-    result["items"] = add_posters_safe(result["items"])
+    # Запросы к TMDB блокирующие — выполняем их в пуле потоков, не занимая цикл событий
+    if posters:
+        result["items"] = await run_in_threadpool(add_posters_safe, result["items"])
     return result
 
 
@@ -77,30 +118,42 @@ def get_films_with_posters(fetch_items, fetch_total, limit: int, offset: int, **
 # Маршруты
 # -----------------------------
 @router.get('/latest')
-def get_latest_films_route(offset: int = Query(0, ge=0), limit: int = Query(10, ge=1, le=50)):
+async def get_latest_films_route(offset: int = Query(0, ge=0), limit: int = Query(10, ge=1, le=50),
+                                 cursor: str | None = Query(None), posters: bool = Query(True)):
     """Получает последние добавленные фильмы с пагинацией"""
-    result = paginate(
+    result = await apaginate(
         fetch_items=db_get_films,
         fetch_total=get_films_count,
         limit=limit,
-        offset=offset
+        offset=offset,
+        cursor=cursor
     )
-    result["items"] = add_posters(result["items"])
+    if posters:
+        result["items"] = await run_in_threadpool(add_posters, result["items"])
     return result
 
 
 @router.get('/search/keyword')
-def search_films_by_keyword_route(query: str, offset: int = Query(0, ge=0), limit: int = Query(10, ge=1, le=1000)):
+async def search_films_by_keyword_route(query: str, offset: int = Query(0, ge=0), limit: int = Query(10, ge=1, le=1000),
+                                        cursor: str | None = Query(None),
+                                        sort: str = Query("relevance", pattern="^(relevance|newest)$")):
     """Поиск фильмов по ключевому слову в названии"""
     try:
-        result = paginate(
+        # Курсор кодирует позицию (release_year, film_id), поэтому работает только с sort=newest
+        if cursor and sort != "newest":
+            raise InvalidCursor("Cursor pagination requires sort=newest")
+        page_kwargs = {"cursor": cursor} if sort == "newest" else {}
+        result = await apaginate(
             fetch_items=db_search_films_by_keyword,
             fetch_total=count_films_by_keyword,
             keyword=query,
             limit=limit,
-            offset=offset
+            offset=offset,
+            sort=sort,
+            **page_kwargs
         )
         result["query"] = query
+        result["sort"] = sort
         
         try:
             log_search_keyword(search_type='keyword', params={"query": query})
@@ -109,6 +162,8 @@ def search_films_by_keyword_route(query: str, offset: int = Query(0, ge=0), limi
             print("Logging failed:", e)
         # Логирование уже выполняется выше через log_search_keyword
         return result
+    except InvalidCursor:
+        raise
     except Exception as e:
         print(f"Database error in search_films_by_keyword: {e}")
         # Return empty result instead of 500 error
@@ -123,9 +178,9 @@ def search_films_by_keyword_route(query: str, offset: int = Query(0, ge=0), limi
 
 
 @router.get('/search/actor')
-def search_films_by_actor(full_name: str, offset: int = Query(0, ge=0), limit: int = Query(10, ge=1, le=50)):
+async def search_films_by_actor(full_name: str, offset: int = Query(0, ge=0), limit: int = Query(10, ge=1, le=50)):
     """Поиск фильмов по имени актера"""
-    result = paginate(
+    result = await apaginate(
         fetch_items=db_search_films_by_actor,
         fetch_total=count_films_by_actor,
         full_name=full_name,
@@ -138,24 +193,27 @@ def search_films_by_actor(full_name: str, offset: int = Query(0, ge=0), limit: i
 
 
 @router.get('/search/genres')
-def get_title_year_genres_route(category_id: int, year_from: int, year_to: int, offset: int = Query(0, ge=0),
-                                limit: int = Query(10, ge=1, le=50)):
+async def get_title_year_genres_route(category_id: int, year_from: int, year_to: int, offset: int = Query(0, ge=0),
+                                      limit: int = Query(10, ge=1, le=50), cursor: str | None = Query(None),
+                                      posters: bool = Query(True)):
     """Получает фильмы по жанру и диапазону лет"""
-    result = paginate(
+    result = await apaginate(
         fetch_items=db_get_title_year_genres,
         fetch_total=count_films_by_genres_year_range,
         category_id=category_id,
         year_from=year_from,
         year_to=year_to,
         limit=limit,
-        offset=offset
+        offset=offset,
+        cursor=cursor
     )
     result["category_id"] = category_id
     result["year_from"] = year_from
     result["year_to"] = year_to
-    result["items"] = add_posters(result["items"])  # Commented out to speed up response
+    if posters:
+        result["items"] = await run_in_threadpool(add_posters, result["items"])
     # Get genre name for logging
-    genres = db_get_all_genres()
+    genres = await db_get_all_genres()
     genre_name = next((g.get('name', '') for g in genres if g.get('category_id') == category_id), f"genre_{category_id}")
     
     try:
@@ -172,11 +230,23 @@ def get_title_year_genres_route(category_id: int, year_from: int, year_to: int,
     return result
 
 
+@router.get('/posters')
+async def get_posters_route(ids: str = Query(..., pattern=r"^\d+(,\d+)*$", description="film_id через запятую")):
+    """Возвращает URL постеров для набора фильмов — для догрузки постеров после показа списка"""
+    film_ids = list(dict.fromkeys(int(film_id) for film_id in ids.split(",")))
+    if len(film_ids) > 50:
+        raise HTTPException(status_code=400, detail="No more than 50 ids per request")
+    films = await get_films_by_ids(film_ids)
+    films = await run_in_threadpool(add_posters_safe, films)
+    items = [{"film_id": film["film_id"], "poster_url": film["poster_url"]} for film in films]
+    return {"items": items, "count": len(items)}
+
+
 @router.get('/genres', response_model=GenreListResponse)
-def get_all_genres_route():
+async def get_all_genres_route():
     """Получает список всех жанров"""
     try:
-        items = db_get_all_genres()
+        items = await db_get_all_genres()
         genre_items = [Genre(**item) for item in items]
         return GenreListResponse(items=genre_items, count=len(genre_items))
     except Exception as e:
@@ -184,24 +254,25 @@ def get_all_genres_route():
 
 
 @router.get('/min_max_year/keyword')
-def get_min_max_year_route():
+async def get_min_max_year_route():
     """Получает минимальный и максимальный год в базе данных"""
-    items = get_years()
+    items = await get_years()
     return items
 
 
 @router.get('/search/year_range')
-def search_films_by_year_range_route(year_from: int, year_to: int, category_id: int = Query(None), offset: int = Query(0, ge=0),
-                                     limit: int = Query(10, ge=1, le=50)):
+async def search_films_by_year_range_route(year_from: int, year_to: int, category_id: int = Query(None), offset: int = Query(0, ge=0),
+                                           limit: int = Query(10, ge=1, le=50), cursor: str | None = Query(None)):
     """Поиск фильмов по диапазону лет с опциональным фильтром жанра"""
-    result = paginate(
+    result = await apaginate(
         fetch_items=db_get_films_by_year_range,
         fetch_total=count_films_by_year_range,
         year_from=year_from,
         year_to=year_to,
         category_id=category_id,
         limit=limit,
-        offset=offset
+        offset=offset,
+        cursor=cursor
     )
     result["year_from"] = year_from
     result["year_to"] = year_to
@@ -211,12 +282,12 @@ def search_films_by_year_range_route(year_from: int, year_to: int, category_id:
 
 
 @router.get('/search/year')
-def search_films_by_year_route(year: int, offset: int = Query(0, ge=0), limit: int = Query(10, ge=1, le=50)):
+async def search_films_by_year_route(year: int, offset: int = Query(0, ge=0), limit: int = Query(10, ge=1, le=50)):
     """Поиск фильмов по конкретному году"""
     print(f"/films/search/year called with year={year} offset={offset} limit={limit}")
     error_msg = None
     try:
-        result = paginate(
+        result = await apaginate(
             fetch_items=db_get_films_by_year,
             fetch_total=count_films_by_year,
             year=year,
@@ -250,29 +321,33 @@ def search_films_by_year_route(year: int, offset: int = Query(0, ge=0), limit: i
 
 
 @router.get('/search/new')
-def get_new_films_route(offset: int = Query(0, ge=0), limit: int = Query(10, ge=1, le=50)):
+async def get_new_films_route(offset: int = Query(0, ge=0), limit: int = Query(10, ge=1, le=50),
+                              cursor: str | None = Query(None), posters: bool = Query(True)):
     """Получает новинки фильмов с пагинацией"""
-    return get_films_with_posters(get_new_films, get_new_films_count, limit, offset)
+    return await get_films_with_posters(get_new_films, get_new_films_count, limit, offset, posters, cursor=cursor)
 
 
 @router.get('/search/popular')
-def get_popular_films_route(offset: int = Query(0, ge=0), limit: int = Query(10, ge=1, le=50)):
+async def get_popular_films_route(offset: int = Query(0, ge=0), limit: int = Query(10, ge=1, le=50),
+                                  posters: bool = Query(True)):
     """Получает популярные фильмы с пагинацией"""
-    return get_films_with_posters(get_popular_films, get_popular_films_count, limit, offset)
+    return await get_films_with_posters(get_popular_films, get_popular_films_count, limit, offset, posters)
 
 
 @router.get('/search/top-rated')
-def get_top_rated_films_route(offset: int = Query(0, ge=0), limit: int = Query(10, ge=1, le=50)):
+async def get_top_rated_films_route(offset: int = Query(0, ge=0), limit: int = Query(10, ge=1, le=50),
+                                    posters: bool = Query(True)):
     """Получает фильмы с высоким рейтингом с пагинацией"""
-    return get_films_with_posters(get_top_rated_films, get_top_rated_films_count, limit, offset)
+    return await get_films_with_posters(get_top_rated_films, get_top_rated_films_count, limit, offset, posters)
 
 
 @router.get('/search/random')
-def get_random_films_route(limit: int = Query(10, ge=1, le=50)):
+async def get_random_films_route(limit: int = Query(10, ge=1, le=50), posters: bool = Query(True)):
     """Получает случайные фильмы"""
     try:
-        films = get_random_films(limit=limit)
-        films = add_posters_safe(films)
+        films = await get_random_films(limit=limit)
+        if posters:
+            films = await run_in_threadpool(add_posters_safe, films)
         return {
             "items": films,
             "total": len(films),
@@ -282,14 +357,13 @@ def get_random_films_route(limit: int = Query(10, ge=1, le=50)):
         }
     except Exception as e:
         print(f"Error in get_random_films_route: {e}")
-        films = get_random_films(limit=limit)
-        films = add_posters_safe(films)
+        # Повтор того же запроса не поможет — отдаём пустой результат
         return {
-            "items": films,
-            "total": len(films),
+            "items": [],
+            "total": 0,
             "offset": 0,
             "limit": limit,
-            "count": len(films)
+            "count": 0
         }
 
 
@@ -1,12 +1,20 @@
 from fastapi import APIRouter, Query, Body
 from pydantic import BaseModel
 from typing import Optional, List
-from utils.log_writer import log_search_keyword
+from utils.log_writer import log_search_keyword, get_log_writer_stats
 from db.my_mongo import (
     get_popular_queries,
-    get_recent_queries
+    get_recent_queries,
+    get_trending_queries,
+    TRENDING_WINDOWS
 )
-from db.my_sql import get_years
+from db.my_sql import get_years, get_pool_stats, get_count_cache_stats, invalidate_counts
+from db.my_sql_async import get_pool_stats as get_async_pool_stats
+from db.snapshot import all_stats as get_snapshot_stats
+from utils.tmdb import get_tmdb_stats
+from utils.poster_cache import get_stats as get_poster_cache_stats
+from utils.poster_prefetch import get_stats as get_poster_prefetch_stats
+from utils.poster_store import get_stats as get_poster_store_stats
 
 # Роутер для мета-информации (поисковые запросы)
 router = APIRouter(prefix="/meta", tags=["meta"])
@@ -65,6 +73,20 @@ def popular_queries(limit: int = Query(5, ge=1, le=20)):
     }
 
 
+@router.get("/trending")
+def trending_queries(window: str = Query("24h", pattern=f"^({'|'.join(TRENDING_WINDOWS)})$"),
+                     limit: int = Query(10, ge=1, le=50)):
+    """
+    Получить самые частые поисковые запросы за последний час, сутки или неделю
+    """
+    items = get_trending_queries(window, limit)
+    return {
+        "window": window,
+        "items": items,
+        "count": len(items)
+    }
+
+
 @router.get("/unique")
 def unique_queries(limit: int = Query(5, ge=1, le=20)):
     """
@@ -132,3 +154,28 @@ def year_range():
             "max_year": 2025
         }
 
+
+@router.get("/metrics")
+def metrics():
+    """
+    Получить внутренние счётчики сервиса (пул соединений MySQL и т.д.)
+    """
+    return {
+        "mysql_pool": get_pool_stats(),
+        "mysql_async_pool": get_async_pool_stats(),
+        "snapshots": get_snapshot_stats(),
+        "count_cache": get_count_cache_stats(),
+        "tmdb": get_tmdb_stats(),
+        "poster_cache": get_poster_cache_stats(),
+        "poster_prefetch": get_poster_prefetch_stats(),
+        "poster_store": get_poster_store_stats(),
+        "search_log": get_log_writer_stats(),
+    }
+
+
+@router.post("/cache/counts/invalidate")
+def invalidate_count_cache(name: Optional[str] = Query(None)):
+    """
+    Сбросить кэш подсчётов total (после изменения каталога); name — имя функции подсчёта
+    """
+    return {"invalidated": invalidate_counts(name)}
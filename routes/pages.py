@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Request, HTTPException
 from utils.templates import templates
-from db.my_sql import get_film_by_id
+from db.my_sql_async import get_film_by_id
 
 router = APIRouter(tags=["pages"])
 
@@ -9,9 +9,9 @@ def index_page(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 @router.get("/movie/{film_id}")
-def movie_detail_page(request: Request, film_id: int):
+async def movie_detail_page(request: Request, film_id: int):
     try:
-        film = get_film_by_id(film_id)
+        film = await get_film_by_id(film_id)
         if not film:
             raise HTTPException(status_code=404, detail="Film not found")
         return templates.TemplateResponse("movie_detail.html", {"request": request, "film": film})
@@ -0,0 +1,47 @@
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import FileResponse, RedirectResponse, Response
+from starlette.concurrency import run_in_threadpool
+
+from db.my_sql_async import get_film_by_id
+from utils.poster_store import SIZES, find_file, get_file
+from utils.tmdb import NO_POSTER_URL, download_image, get_poster
+
+# Локальный прокси изображений постеров: файл скачивается из TMDB один раз и отдаётся с диска
+router = APIRouter(prefix="/posters", tags=["posters"])
+
+# Содержимое файла для film_id и размера не меняется — браузер может долго не перезапрашивать его
+CACHE_CONTROL = "public, max-age=2592000"
+
+
+def _file_response(request: Request, path: str, etag: str) -> Response:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    # FileResponse отдаёт файл через sendfile, если сервер это поддерживает
+    return FileResponse(path, media_type="image/jpeg", headers=headers)
+
+
+@router.get("/{film_id}")
+async def get_poster_image(request: Request, film_id: int,
+                           size: str = Query("w500", pattern=f"^({'|'.join(SIZES)})$")):
+    """Изображение постера фильма; size — ширина варианта (w92, w185, w342, w500)"""
+    # Файл уже на диске — отдаём его без обращения к MySQL и кэшу постеров
+    found = await run_in_threadpool(find_file, film_id, size)
+    if found is not None:
+        return _file_response(request, *found)
+
+    film = await get_film_by_id(film_id)
+    if not film:
+        raise HTTPException(status_code=404, detail="Film not found")
+
+    poster_url = await run_in_threadpool(get_poster, film_id, film["title"])
+    if poster_url == NO_POSTER_URL:
+        # Постер может появиться позже (фоновая загрузка), поэтому заглушку кэшируем ненадолго
+        return RedirectResponse(NO_POSTER_URL, headers={"Cache-Control": "public, max-age=300"})
+
+    try:
+        path, etag = await run_in_threadpool(get_file, film_id, size, poster_url, download_image)
+    except Exception as e:
+        print(f"Poster image error for film {film_id}: {e}")
+        return RedirectResponse(NO_POSTER_URL, headers={"Cache-Control": "no-store"})
+    return _file_response(request, path, etag)
@@ -9,13 +9,53 @@ class Settings(BaseSettings):
     MYSQL_USER: str
     MYSQL_PASSWORD: str
     MYSQL_DB: str
+    MYSQL_POOL_SIZE: int = 5
+    MYSQL_POOL_MAX_OVERFLOW: int = 10
+    MYSQL_POOL_RECYCLE: int = 1800  # секунды простоя до переподключения
+    MYSQL_POOL_TIMEOUT: float = 10.0  # ожидание свободного соединения
+    MYSQL_POOL_PRE_PING: bool = True
+
+    SEARCH_INDEX_TTL: int = 300  # секунды до перестроения индексов названий и имён актёров
+    POPULARITY_REFRESH_INTERVAL: int = 300  # период обновления рейтинга популярности
+    CATALOG_SNAPSHOT_TTL: int = 300  # секунды до перезагрузки film_id и жанров в памяти
+    COUNT_CACHE_TTL: int = 300  # секунды жизни закэшированного total для пагинации
+    COUNT_CACHE_SIZE: int = 1024
 
     MONGO_URL: str
     MONGO_DB: str
     MONGO_LOG_COLLECTION: str
     MONGO_LOG_STATS: str = "stats"
+    MONGO_QUERY_ROLLUP: str = "query_rollup"  # сводка по поисковым запросам для /meta/popular и /meta/recent
+    MONGO_QUERY_BUCKETS: str = "query_buckets"  # почасовые и посуточные счётчики для /meta/trending
+    LOG_RETENTION_DAYS: int = 30  # срок хранения сырых логов поиска (TTL), 0 — бессрочно
+    TREND_HOURLY_RETENTION_DAYS: int = 2
+    TREND_DAILY_RETENTION_DAYS: int = 30
+    LOG_QUEUE_SIZE: int = 10000  # записей поиска в очереди, сверх — отбрасываются
+    LOG_BATCH_SIZE: int = 500  # документов в одном insert_many
+    LOG_FLUSH_INTERVAL: float = 1.0  # секунды, не дольше которых запись ждёт в очереди
+    IMPRESSION_FLUSH_INTERVAL: float = 5.0  # период записи накопленных показов фильмов
 
     TMDB_API_KEY: str
+    TMDB_BASE_URL: str = "https://api.themoviedb.org/3"
+    TMDB_TIMEOUT: float = 2.0
+    TMDB_POOL_SIZE: int = 16  # keep-alive соединения к TMDB, не меньше POSTER_WORKERS
+    TMDB_MAX_RETRIES: int = 2
+    TMDB_RETRY_BACKOFF: float = 0.3  # секунды, удваиваются с каждой попыткой
+    TMDB_BREAKER_FAILURES: int = 5  # ошибок подряд до размыкания
+    TMDB_BREAKER_COOLDOWN: float = 30.0  # секунды без запросов к TMDB после размыкания
+    TMDB_RATE_LIMIT: float = 40.0  # запросов в секунду на процесс, 0 — без ограничения
+    TMDB_RATE_BURST: int = 40
+    POSTER_WORKERS: int = 16  # параллельные запросы постеров к TMDB
+    POSTER_DEADLINE: float = 3.0  # секунды на все постеры страницы, дальше — заглушка
+    POSTER_PREFETCH: bool = True  # промахи и прогрев каталога загружаются в фоне
+    POSTER_PREFETCH_RATE: float = 4.0  # запросов к TMDB в секунду из фоновой загрузки
+    POSTER_PREFETCH_QUEUE_SIZE: int = 5000
+    POSTER_WARMUP_LEASE_TTL: float = 60.0  # секунды аренды прогрева каталога одним воркером
+    POSTER_NEGATIVE_TTL: int = 86400  # через сколько секунд повторить поиск постера, которого не нашли
+    POSTER_PROXY: bool = True  # отдавать в списках /posters/{film_id} вместо прямых ссылок на TMDB
+    POSTER_LIST_SIZE: str = "w185"  # размер миниатюры для карточек в списках
+    POSTER_STORE_DIR: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "poster_store")
+    POSTER_STORE_MAX_BYTES: int = 512 * 1024 * 1024  # бюджет диска, сверх него удаляются давно не запрошенные файлы
     # MONGODB_URL_EDIT: str
     model_config = SettingsConfigDict(
         env_file=os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"),
@@ -16,7 +16,7 @@ export class MovieAPI {
     
     // Получение новых фильмов
     static async getNewMovies(limit = 10, offset = 0, signal = null) {
-        return this.makeRequest(`${this.BASE_URL}/films/search/new?limit=${limit}&offset=${offset}`, signal);
+        return this.makeRequest(`${this.BASE_URL}/films/search/new?limit=${limit}&offset=${offset}&posters=false`, signal);
     }
     
     // Поиск по ключевому слову
@@ -37,7 +37,13 @@ export class MovieAPI {
     // Поиск по жанру
     static async searchByGenre(genreId, limit = 10, offset = 0, signal = null) {
         const currentYear = new Date().getFullYear();
-        const url = `${this.BASE_URL}/films/search/genres?category_id=${genreId}&year_from=1900&year_to=${currentYear}&limit=${limit}&offset=${offset}`;
+        const url = `${this.BASE_URL}/films/search/genres?category_id=${genreId}&year_from=1900&year_to=${currentYear}&limit=${limit}&offset=${offset}&posters=false`;
+        return this.makeRequest(url, signal);
+    }
+    
+    // Постеры для набора фильмов (списки загружаются без постеров, постеры догружаются отдельно)
+    static async getPosters(filmIds, signal = null) {
+        const url = `${this.BASE_URL}/films/posters?ids=${filmIds.join(',')}`;
         return this.makeRequest(url, signal);
     }
 }
@@ -347,6 +347,7 @@ export class SearchManager {
             }
             
             UIManager.displayNewMovies(movies);
+            this.loadPosters(movies, UIManager.getElement('newMovies'));
             UIManager.updatePagination(total, this.state.currentPage, this.state.limit);
             console.log('Фильмы добавлены в DOM');
         } catch (error) {
@@ -590,6 +591,27 @@ export class SearchManager {
         return filtered;
     }
     
+    // Догрузить постеры для уже показанных карточек (списки приходят без постеров)
+    async loadPosters(movies, container) {
+        const noPoster = '/static/images/no-poster.svg';
+        const missing = movies.filter(movie => movie.film_id && (!movie.poster_url || movie.poster_url === noPoster));
+        // Эндпоинт принимает не больше 50 id за запрос
+        for (let i = 0; i < missing.length; i += 50) {
+            const chunk = missing.slice(i, i + 50);
+            try {
+                const data = await MovieAPI.getPosters(chunk.map(movie => movie.film_id));
+                const byId = new Map((data.items || []).map(item => [item.film_id, item.poster_url]));
+                // Обновляем и сами объекты — они же лежат в кэше результатов
+                chunk.forEach(movie => {
+                    if (byId.has(movie.film_id)) movie.poster_url = byId.get(movie.film_id);
+                });
+                UIManager.fillPosters(container, data.items || []);
+            } catch (error) {
+                console.warn('Error loading posters:', error);
+            }
+        }
+    }
+    
     // Отобразить результаты поиска
     displaySearchResults(movies, total) {
         console.log('displaySearchResults called with:', { movies: movies.length, total });
@@ -611,6 +633,7 @@ export class SearchManager {
             moviesList.innerHTML = '';
             moviesList.appendChild(fragment);
             console.log('Movies added to DOM');
+            this.loadPosters(movies, moviesList);
         }
         
         if (searchResults) {
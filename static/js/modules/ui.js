@@ -122,7 +122,7 @@ export class UIManager {
         
         return `
             <div class="movie-card" onclick="window.location.href='/movie/${filmId}'">
-                <img src="${posterUrl}" alt="${title}" class="movie-poster" loading="lazy" onerror="this.src='/static/images/no-poster.svg'">
+                <img src="${posterUrl}" alt="${title}" class="movie-poster" data-film-id="${filmId}" loading="lazy" onerror="this.src='/static/images/no-poster.svg'">
                 <div class="movie-info">
                     <h3 title="${title}">${title}</h3>
                     <p>${year}${genres ? ` • ${genres}` : ''}</p>
@@ -131,6 +131,16 @@ export class UIManager {
         `;
     }
     
+    // Подставить догруженные постеры в уже показанные карточки
+    static fillPosters(container, posters) {
+        if (!container) return;
+        posters.forEach(({ film_id, poster_url }) => {
+            if (!poster_url) return;
+            const img = container.querySelector(`img.movie-poster[data-film-id="${film_id}"]`);
+            if (img && img.getAttribute('src') !== poster_url) img.src = poster_url;
+        });
+    }
+    
     // Обновить пагинацию
     static updatePagination(total, currentPage, limit = 10) {
         const pagination = this.getElement('pagination');
@@ -0,0 +1,116 @@
+import os
+import sqlite3
+import sys
+import threading
+
+# Настройки читаются при импорте settings — задаём их до импорта модулей приложения
+os.environ.setdefault("MYSQL_HOST", "127.0.0.1")
+os.environ.setdefault("MYSQL_USER", "test")
+os.environ.setdefault("MYSQL_PASSWORD", "test")
+os.environ.setdefault("MYSQL_DB", "sakila")
+os.environ.setdefault("MONGO_URL", "mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=100")
+os.environ.setdefault("MONGO_DB", "test")
+os.environ.setdefault("MONGO_LOG_COLLECTION", "logs")
+os.environ.setdefault("TMDB_API_KEY", "test")
+os.environ.setdefault("POSTER_PREFETCH", "false")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import db.my_sql as my_sql
+import db.my_sql_async as my_sql_async
+from db import snapshot
+
+_SCHEMA = """
+CREATE TABLE film (
+    film_id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT,
+    release_year INTEGER,
+    length INTEGER,
+    rating TEXT
+);
+CREATE TABLE category (category_id INTEGER PRIMARY KEY, name TEXT NOT NULL);
+CREATE TABLE film_category (film_id INTEGER, category_id INTEGER, PRIMARY KEY (film_id, category_id));
+CREATE TABLE actor (actor_id INTEGER PRIMARY KEY, first_name TEXT, last_name TEXT);
+CREATE TABLE film_actor (actor_id INTEGER, film_id INTEGER, PRIMARY KEY (actor_id, film_id));
+CREATE TABLE inventory (inventory_id INTEGER PRIMARY KEY, film_id INTEGER);
+CREATE TABLE rental (rental_id INTEGER PRIMARY KEY, inventory_id INTEGER);
+"""
+
+GENRES = {1: "Action", 2: "Comedy", 3: "Drama"}
+RATINGS = ("G", "PG", "PG-13", "R", "NC-17")
+
+
+def _films() -> list[dict]:
+    # Несколько фильмов на каждый год — keyset-пагинация должна различать их по film_id
+    return [
+        {
+            "film_id": film_id,
+            "title": f"{'ACADEMY' if film_id % 3 == 0 else 'DINOSAUR'} {'SECRETS' if film_id % 2 else 'RUN'} {film_id}",
+            "description": f"Film {film_id}",
+            "release_year": 2015 + film_id % 8,
+            "length": 80 + film_id,
+            "rating": RATINGS[film_id % len(RATINGS)],
+        }
+        for film_id in range(1, 48)
+    ]
+
+
+FILMS = _films()
+
+
+class SqlBackend:
+    """Подмножество sakila в SQLite в памяти вместо MySQL
+
+    Запросы приложения используют плейсхолдеры %s и стандартный SQL,
+    поэтому выполняются как есть после замены плейсхолдеров.
+    """
+
+    def __init__(self):
+        self._conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self.queries: list[str] = []
+        self._conn.executescript(_SCHEMA)
+        self._conn.executemany(
+            "INSERT INTO film VALUES (:film_id, :title, :description, :release_year, :length, :rating)", FILMS
+        )
+        self._conn.executemany("INSERT INTO category VALUES (?, ?)", GENRES.items())
+        self._conn.executemany("INSERT INTO film_category VALUES (?, ?)",
+                               [(film["film_id"], film["film_id"] % 3 + 1) for film in FILMS])
+        self._conn.executemany("INSERT INTO actor VALUES (?, ?, ?)",
+                               [(1, "PENELOPE", "GUINESS"), (2, "NICK", "WAHLBERG")])
+        self._conn.executemany("INSERT INTO film_actor VALUES (?, ?)",
+                               [(1 + film["film_id"] % 2, film["film_id"]) for film in FILMS])
+        self._conn.executemany("INSERT INTO inventory VALUES (?, ?)", [(film["film_id"], film["film_id"]) for film in FILMS])
+        # Чем больше film_id, тем больше аренд
+        rentals = [film["film_id"] for film in FILMS for _ in range(film["film_id"] % 5)]
+        self._conn.executemany("INSERT INTO rental (inventory_id) VALUES (?)", [(i,) for i in rentals])
+
+    def query_all(self, sql: str, params: tuple = ()) -> list[dict]:
+        with self._lock:
+            self.queries.append(sql)
+            return [dict(row) for row in self._conn.execute(sql.replace("%s", "?"), params)]
+
+    async def aquery_all(self, sql: str, params: tuple = ()) -> list[dict]:
+        return self.query_all(sql, params)
+
+
+def _reset_caches() -> None:
+    for item in snapshot._registry:
+        item._value = None
+        item._built_at = None
+    my_sql.invalidate_counts()
+
+
+@pytest.fixture(autouse=True)
+def sql_backend(monkeypatch):
+    """Подменяет query_all синхронного и асинхронного модулей на SQLite в памяти"""
+    backend = SqlBackend()
+    monkeypatch.setattr(my_sql, "query_all", backend.query_all)
+    monkeypatch.setattr(my_sql_async, "query_all", backend.aquery_all)
+    _reset_caches()
+    yield backend
+    _reset_caches()
@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+import db.my_sql as my_sql
+import db.my_sql_async as my_sql_async
+from db.count_cache import CountCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_count_cache_expires_after_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    cache = CountCache(maxsize=10, ttl=60)
+    cache.set(("count", (1,)), 5)
+    clock.now += 59
+    assert cache.get(("count", (1,))) == 5
+    clock.now += 2
+    assert cache.get(("count", (1,))) is None
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["expired"] == 1
+
+
+def test_count_cache_evicts_least_recently_used():
+    cache = CountCache(maxsize=2, ttl=0)
+    cache.set(("a", ()), 1)
+    cache.set(("b", ()), 2)
+    assert cache.get(("a", ())) == 1
+    cache.set(("c", ()), 3)
+    assert cache.get(("b", ())) is None
+    assert cache.get(("a", ())) == 1 and cache.get(("c", ())) == 3
+    assert cache.stats()["evicted"] == 1
+
+
+def test_count_cache_invalidate_by_name():
+    cache = CountCache()
+    cache.set(("count_films_by_year", (2006,)), 1)
+    cache.set(("count_films_by_year", (2007,)), 2)
+    cache.set(("get_films_count", ()), 3)
+    assert cache.invalidate("count_films_by_year") == 2
+    assert cache.get(("get_films_count", ())) == 3
+    assert cache.invalidate() == 1
+    assert cache.stats()["size"] == 0
+
+
+def _count_queries(backend) -> int:
+    return sum("COUNT(*)" in sql for sql in backend.queries)
+
+
+def test_totals_are_served_from_cache(sql_backend):
+    assert my_sql.count_films_by_year(2016) == asyncio.run(my_sql_async.count_films_by_year(2016))
+    assert _count_queries(sql_backend) == 1
+    my_sql.invalidate_counts("count_films_by_year")
+    asyncio.run(my_sql_async.count_films_by_year(2016))
+    assert _count_queries(sql_backend) == 2
@@ -0,0 +1,47 @@
+import time
+
+from pymongo.errors import AutoReconnect, OperationFailure
+
+import utils.log_writer as log_writer
+
+
+class FakeStats:
+    """Коллекция stats: create_index по очереди выбрасывает ошибки из errors"""
+
+    def __init__(self, errors: list[Exception]):
+        self.errors = errors
+        self.calls = 0
+
+    def create_index(self, *args, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+
+
+def _use(monkeypatch, collection: FakeStats) -> None:
+    monkeypatch.setattr(log_writer, "_stats", collection)
+    monkeypatch.setattr(log_writer, "_stats_indexed", False)
+    monkeypatch.setattr(log_writer, "_stats_index_retry_at", 0.0)
+
+
+def test_stats_index_retried_after_transient_failure(monkeypatch):
+    collection = FakeStats([AutoReconnect("connection refused")])
+    _use(monkeypatch, collection)
+    log_writer._ensure_stats_index()
+    assert not log_writer._stats_indexed
+    # В течение минуты повторов нет
+    log_writer._ensure_stats_index()
+    assert collection.calls == 1
+    monkeypatch.setattr(log_writer, "_stats_index_retry_at", time.monotonic() - 1)
+    log_writer._ensure_stats_index()
+    assert collection.calls == 2
+    assert log_writer._stats_indexed
+
+
+def test_stats_index_not_retried_on_duplicate_keys(monkeypatch):
+    collection = FakeStats([OperationFailure("E11000 duplicate key error", code=11000)])
+    _use(monkeypatch, collection)
+    log_writer._ensure_stats_index()
+    log_writer._ensure_stats_index()
+    assert collection.calls == 1
+    assert log_writer._stats_indexed
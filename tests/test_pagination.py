@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+import db.my_sql_async as my_sql_async
+from tests.conftest import FILMS
+from utils.pagination import InvalidCursor, apaginate, decode_cursor, encode_cursor
+
+NEWEST = sorted(FILMS, key=lambda film: (film["release_year"], film["film_id"]), reverse=True)
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(2006, 1000)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (2006, 1000)
+
+
+@pytest.mark.parametrize("cursor", ["garbage", "!!!", encode_cursor(2006, 1)[:-2], "WzEsMiwzXQ"])
+def test_decode_cursor_rejects_invalid(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+
+
+def test_apaginate_offset_page():
+    page = asyncio.run(apaginate(my_sql_async.get_films, my_sql_async.get_films_count, limit=5, offset=10))
+    assert page["total"] == len(FILMS)
+    assert page["offset"] == 10 and page["limit"] == 5 and page["count"] == 5
+    assert [film["film_id"] for film in page["items"]] == [film["film_id"] for film in NEWEST[10:15]]
+    assert "next_cursor" not in page
+
+
+def _walk(fetch_items, fetch_total, limit: int, **kwargs) -> list[dict]:
+    """Проходит все страницы по next_cursor"""
+    pages = []
+    cursor = None
+    while True:
+        page = asyncio.run(apaginate(fetch_items, fetch_total, limit=limit, offset=0, cursor=cursor, **kwargs))
+        pages.append(page)
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def test_apaginate_keyset_covers_all_films_once():
+    pages = _walk(my_sql_async.get_films, my_sql_async.get_films_count, limit=10)
+    film_ids = [film["film_id"] for page in pages for film in page["items"]]
+    assert film_ids == [film["film_id"] for film in NEWEST]
+    assert all(page["total"] == len(FILMS) for page in pages)
+
+
+def test_apaginate_cursor_ignores_offset():
+    first = asyncio.run(apaginate(my_sql_async.get_films, my_sql_async.get_films_count,
+                                  limit=5, offset=0, cursor=None))
+    second = asyncio.run(apaginate(my_sql_async.get_films, my_sql_async.get_films_count,
+                                   limit=5, offset=20, cursor=first["next_cursor"]))
+    assert second["offset"] == 0
+    assert [film["film_id"] for film in second["items"]] == [film["film_id"] for film in NEWEST[5:10]]
+
+
+def test_apaginate_keyset_search_matches_newest_order():
+    pages = _walk(my_sql_async.search_films_by_keyword, my_sql_async.count_films_by_keyword,
+                  limit=4, keyword="academy", sort="newest")
+    film_ids = [film["film_id"] for page in pages for film in page["items"]]
+    expected = [film["film_id"] for film in NEWEST if "ACADEMY" in film["title"]]
+    assert film_ids == expected
+    assert pages[0]["total"] == len(expected)
+
+
+def test_apaginate_invalid_cursor():
+    with pytest.raises(InvalidCursor):
+        asyncio.run(apaginate(my_sql_async.get_films, my_sql_async.get_films_count,
+                              limit=5, offset=0, cursor="garbage"))
@@ -0,0 +1,196 @@
+import asyncio
+
+import pytest
+from mysql.connector.errors import OperationalError, PoolError
+
+from db.pool import AsyncConnectionPool, ConnectionPool
+
+
+class FakeConnection:
+    def __init__(self, number: int):
+        self.number = number
+        self.alive = True
+        self.closed = False
+
+
+class FakeAsyncPool(AsyncConnectionPool):
+    """Пул без сети: соединения — объекты FakeConnection"""
+
+    def __init__(self, **kwargs):
+        super().__init__({}, **kwargs)
+        self.connections: list[FakeConnection] = []
+
+    async def _connect(self):
+        conn = FakeConnection(len(self.connections) + 1)
+        self.connections.append(conn)
+        return conn
+
+    async def _is_alive(self, conn) -> bool:
+        return conn.alive
+
+    @staticmethod
+    async def _close(conn) -> None:
+        conn.closed = True
+
+
+class FakePool(ConnectionPool):
+    def __init__(self, **kwargs):
+        super().__init__({}, **kwargs)
+        self.connections: list[FakeConnection] = []
+
+    def _connect(self):
+        conn = FakeConnection(len(self.connections) + 1)
+        self.connections.append(conn)
+        return conn
+
+    def _is_alive(self, conn) -> bool:
+        return conn.alive
+
+    @staticmethod
+    def _close(conn) -> None:
+        conn.closed = True
+
+
+def test_async_pool_reuses_idle_connection():
+    pool = FakeAsyncPool(size=2, max_overflow=0)
+
+    async def run():
+        async with pool.connection() as first:
+            pass
+        async with pool.connection() as second:
+            pass
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first is second
+    stats = pool.stats()
+    assert stats["created"] == 1
+    assert stats["checkouts"] == 2
+    assert stats["idle"] == 1 and stats["in_use"] == 0
+
+
+def test_async_pool_overflow_connections_are_closed_on_checkin():
+    pool = FakeAsyncPool(size=1, max_overflow=1)
+
+    async def run():
+        async with pool.connection() as first:
+            async with pool.connection() as second:
+                assert pool.stats()["in_use"] == 2
+        return first, second
+
+    first, second = asyncio.run(run())
+    # Первым вернулось second и осталось в пуле, first уже сверх size
+    assert first.closed and not second.closed
+    stats = pool.stats()
+    assert stats["opened"] == 1
+    assert stats["discarded"] == 1
+
+
+def test_async_pool_exhausted_raises_after_timeout():
+    pool = FakeAsyncPool(size=1, max_overflow=0, timeout=0.05)
+
+    async def run():
+        async with pool.connection():
+            with pytest.raises(PoolError):
+                async with pool.connection():
+                    pass
+
+    asyncio.run(run())
+    stats = pool.stats()
+    assert stats["exhausted"] == 1
+    assert stats["waits"] == 1
+    assert stats["in_use"] == 0
+
+
+def test_async_pool_waiter_gets_released_connection():
+    pool = FakeAsyncPool(size=1, max_overflow=0, timeout=1)
+
+    async def hold():
+        async with pool.connection() as conn:
+            await asyncio.sleep(0.02)
+            return conn
+
+    async def run():
+        return await asyncio.gather(hold(), hold())
+
+    first, second = asyncio.run(run())
+    assert first is second
+    assert pool.stats()["waits"] == 1
+    assert pool.stats()["created"] == 1
+
+
+def test_async_pool_discards_broken_connection():
+    pool = FakeAsyncPool(size=1, max_overflow=0)
+
+    async def run():
+        with pytest.raises(OperationalError):
+            async with pool.connection():
+                raise OperationalError("Lost connection to MySQL server")
+        async with pool.connection() as conn:
+            return conn
+
+    conn = asyncio.run(run())
+    assert pool.connections[0].closed
+    assert conn is pool.connections[1]
+    assert pool.stats()["discarded"] == 1
+
+
+def test_async_pool_discards_connection_of_cancelled_query():
+    pool = FakeAsyncPool(size=1, max_overflow=0)
+
+    async def query():
+        async with pool.connection():
+            await asyncio.sleep(10)
+
+    async def run():
+        task = asyncio.create_task(query())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert pool.connections[0].closed
+    assert pool.stats()["opened"] == 0
+
+
+def test_async_pool_replaces_dead_idle_connection():
+    pool = FakeAsyncPool(size=1, max_overflow=0, pre_ping=True)
+
+    async def run():
+        async with pool.connection() as conn:
+            conn.alive = False
+        async with pool.connection() as conn:
+            return conn
+
+    conn = asyncio.run(run())
+    assert conn.number == 2
+    assert pool.connections[0].closed
+    assert pool.stats()["ping_failures"] == 1
+
+
+def test_async_pool_frees_slot_when_connect_fails():
+    pool = FakeAsyncPool(size=1, max_overflow=0, timeout=0.05)
+
+    async def failing_connect():
+        raise OperationalError("Can't connect to MySQL server")
+
+    async def run():
+        pool._connect = failing_connect
+        with pytest.raises(OperationalError):
+            async with pool.connection():
+                pass
+
+    asyncio.run(run())
+    assert pool.stats()["opened"] == 0
+
+
+def test_sync_pool_exhausted_raises_after_timeout():
+    pool = FakePool(size=1, max_overflow=0, timeout=0.05)
+    with pool.connection():
+        with pytest.raises(PoolError):
+            with pool.connection():
+                pass
+    with pool.connection() as conn:
+        assert conn is pool.connections[0]
+    assert pool.stats()["exhausted"] == 1
@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+import utils.poster_cache as poster_cache
+import utils.poster_prefetch as poster_prefetch
+import utils.tmdb as tmdb
+from settings import settings
+
+
+@pytest.fixture
+def cache_db(tmp_path, monkeypatch):
+    """Отдельный poster_cache.db во временном каталоге"""
+    monkeypatch.setattr(poster_cache, "CACHE_DB", str(tmp_path / "poster_cache.db"))
+    monkeypatch.setattr(poster_cache, "LEGACY_CACHE_FILE", str(tmp_path / "missing.json"))
+    monkeypatch.setattr(poster_cache, "_by_film", {})
+    monkeypatch.setattr(poster_cache, "_by_title", {})
+    monkeypatch.setattr(poster_cache, "_legacy_by_title", {})
+    monkeypatch.setattr(poster_cache, "_conn", None)
+    monkeypatch.setattr(poster_cache, "_loaded", False)
+    yield
+    if poster_cache._conn is not None:
+        poster_cache._conn.close()
+
+
+def test_lease_held_by_one_owner(cache_db):
+    assert poster_cache.acquire_lease("warmup", "worker-1", ttl=60)
+    assert not poster_cache.acquire_lease("warmup", "worker-2", ttl=60)
+    # Владелец продлевает свою аренду
+    assert poster_cache.acquire_lease("warmup", "worker-1", ttl=60)
+    poster_cache.release_lease("warmup", "worker-2")
+    assert not poster_cache.acquire_lease("warmup", "worker-2", ttl=60)
+    poster_cache.release_lease("warmup", "worker-1")
+    assert poster_cache.acquire_lease("warmup", "worker-2", ttl=60)
+
+
+def test_expired_lease_is_taken_over(cache_db, monkeypatch):
+    assert poster_cache.acquire_lease("warmup", "worker-1", ttl=60)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert poster_cache.acquire_lease("warmup", "worker-2", ttl=60)
+    assert not poster_cache.acquire_lease("warmup", "worker-1", ttl=60)
+
+
+def test_warm_up_waits_for_lease(cache_db, monkeypatch):
+    monkeypatch.setattr(settings, "POSTER_WARMUP_LEASE_TTL", 0.2)
+    monkeypatch.setattr(tmdb, "missing_posters", lambda films: films)
+    enqueued = []
+    monkeypatch.setattr(poster_prefetch, "enqueue", lambda film_id, title: enqueued.append(film_id))
+    # Другой воркер держит аренду и перестал её продлевать
+    assert poster_cache.acquire_lease(poster_prefetch.WARMUP_LEASE, "other-worker", ttl=0.2)
+    started = time.monotonic()
+    poster_prefetch._warm_up(lambda: [{"film_id": 1, "title": "ACADEMY DINOSAUR"}])
+    assert time.monotonic() - started >= 0.2
+    assert enqueued == [1]
+    assert not poster_prefetch.get_stats()["warmup_leader"]
+    # Закончив, воркер освобождает аренду
+    assert poster_cache.acquire_lease(poster_prefetch.WARMUP_LEASE, "other-worker", ttl=60)
@@ -0,0 +1,45 @@
+import importlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+import db.my_sql as my_sql
+from tests.conftest import FILMS
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # При импорте app создаёт индексы и запускает фоновые потоки — в тестах они не нужны
+    monkeypatch.setattr(my_sql, "create_search_indexes", lambda: None)
+    monkeypatch.setattr(my_sql, "start_background_refresh", lambda: None)
+    app_module = importlib.import_module("app")
+    routes_films = importlib.import_module("routes.films")
+    monkeypatch.setattr(routes_films, "log_search_keyword", lambda *args, **kwargs: None)
+    monkeypatch.setattr(routes_films, "log_films_id", lambda *args, **kwargs: None)
+    return TestClient(app_module.app)
+
+
+def test_latest_cursor_walks_whole_catalog(client):
+    film_ids = []
+    params = {"limit": 20, "posters": "false", "cursor": ""}
+    while True:
+        page = client.get("/films/latest", params=params).json()
+        film_ids.extend(film["film_id"] for film in page["items"])
+        if not page["next_cursor"]:
+            break
+        params["cursor"] = page["next_cursor"]
+    assert sorted(film_ids) == sorted(film["film_id"] for film in FILMS)
+    assert len(film_ids) == len(set(film_ids))
+
+
+def test_invalid_cursor_returns_400(client):
+    response = client.get("/films/latest", params={"cursor": "garbage", "posters": "false"})
+    assert response.status_code == 400
+
+
+def test_keyword_cursor_requires_newest_sort(client):
+    response = client.get("/films/search/keyword", params={"query": "academy", "cursor": "WzIwMTYsMV0"})
+    assert response.status_code == 400
+    response = client.get("/films/search/keyword",
+                          params={"query": "academy", "cursor": "WzIwMTYsMV0", "sort": "newest"})
+    assert response.status_code == 200
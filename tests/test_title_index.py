@@ -0,0 +1,46 @@
+from db.title_index import TitleIndex
+
+ROWS = [
+    {"film_id": 1, "title": "ACADEMY DINOSAUR", "release_year": 2006},
+    {"film_id": 2, "title": "ACE GOLDFINGER", "release_year": 2006},
+    {"film_id": 3, "title": "ADAPTATION HOLES", "release_year": 2007},
+    {"film_id": 4, "title": "ACADEMY SECRETS", "release_year": 2005},
+    {"film_id": 5, "title": "DINOSAUR ACADEMY", "release_year": 2007},
+    {"film_id": 6, "title": "ACADEMY RUN", "release_year": 2006},
+    {"film_id": 7, "title": "UNRELATED", "release_year": 2008},
+    {"film_id": 8, "title": "ACADEMY NIGHTS", "release_year": None},
+]
+
+
+def test_search_newest_orders_by_year_then_id():
+    index = TitleIndex(ROWS)
+    assert index.search("academy", sort="newest") == [5, 6, 1, 4, 8]
+
+
+def test_search_after_pages_through_newest_order():
+    index = TitleIndex(ROWS)
+    assert index.search_after("academy", (2007, 5), limit=2) == [6, 1]
+    assert index.search_after("academy", (2006, 1), limit=2) == [4, 8]
+    assert index.search_after("academy", (0, 8), limit=2) == []
+
+
+def test_search_after_position_not_in_results():
+    index = TitleIndex(ROWS)
+    # Позиция удалённого фильма: продолжаем со следующего по порядку
+    assert index.search_after("academy", (2006, 3), limit=10) == [1, 4, 8]
+    assert index.search_after("academy", (2009, 1), limit=1) == [5]
+
+
+def test_search_after_concatenates_to_full_result():
+    index = TitleIndex(ROWS)
+    full = index.search("a", sort="newest")
+    pages = []
+    after = (9999, 0)
+    while True:
+        page = index.search_after("a", after, limit=3)
+        if not page:
+            break
+        pages.extend(page)
+        last = page[-1]
+        after = (index._order[last][0], last)
+    assert pages == full
@@ -1,16 +1,63 @@
-from datetime import datetime, timezone
-from pymongo import MongoClient
+import queue
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pymongo import MongoClient, UpdateOne
 from pymongo.collection import Collection
 from settings import settings
+from utils.text import normalize_name as normalize_query
 
 # Ленивая инициализация позволяет избежать блокировки запуска приложения при недоступности MongoDB
 _client: MongoClient | None = None
 _collection: Collection | None = None
 _stats: Collection | None = None
+_rollup: Collection | None = None
+_buckets: Collection | None = None
+
+# Почасовые и посуточные счётчики запросов для /meta/trending: гранулярность -> (длина интервала, срок хранения)
+BUCKETS = {
+    "hour": (timedelta(hours=1), timedelta(days=settings.TREND_HOURLY_RETENTION_DAYS)),
+    "day": (timedelta(days=1), timedelta(days=settings.TREND_DAILY_RETENTION_DAYS)),
+}
+
+# Записи поиска копятся в ограниченной очереди и пишутся в фоне пачками через insert_many:
+# запрос только кладёт документ в очередь и никогда не ждёт MongoDB
+_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+_flusher: threading.Thread | None = None
+_flusher_lock = threading.Lock()
+_stopping = threading.Event()
+_writer_stats = {
+    "queued": 0,
+    "dropped": 0,
+    "written": 0,
+    "batches": 0,
+    "errors": 0,
+    "rollup_errors": 0,
+    "bucket_errors": 0,
+}
+
+# Показы фильмов суммируются в памяти между запросами и пишутся в фоне
+# одним bulk_write с приращениями $inc: film_id -> (число показов, время последнего)
+_impressions: dict[int, tuple[int, str]] = {}
+_impressions_lock = threading.Lock()
+_impressions_flushed_at = time.monotonic()
+_stats_indexed = False
+_stats_index_retry_at = 0.0
+_rollup_indexed = False
+_log_indexed = False
+_log_index_retry_at = 0.0
+_buckets_indexed = False
+_impression_stats = {
+    "impressions": 0,
+    "flushed_impressions": 0,
+    "upserts": 0,
+    "flushes": 0,
+    "errors": 0,
+}
 
 def _init_mongo():
     """Инициализация подключения к MongoDB с отложенной загрузкой"""
-    global _client, _collection, _stats
+    global _client, _collection, _stats, _rollup, _buckets
     if _client is not None:
         return
     try:
@@ -18,43 +65,373 @@ def _init_mongo():
         db = _client[settings.MONGO_DB]
         _collection = db[settings.MONGO_LOG_COLLECTION]
         _stats = db[settings.MONGO_LOG_STATS]
+        _rollup = db[settings.MONGO_QUERY_ROLLUP]
+        _buckets = db[settings.MONGO_QUERY_BUCKETS]
     except Exception as e:
         # Don't raise on import/startup — logging should be best-effort
         print("Mongo init error:", e)
 
 
-def log_search_keyword(search_type: str, params: dict):
-    """Логирует поисковые запросы в MongoDB"""
+def query_key(search_type: str, params: dict) -> str:
+    """Нормализованный ключ, по которому объединяются одинаковые поисковые запросы
+
+    Текст запроса сравнивается без учёта регистра, диакритики и лишних пробелов.
+    """
+    if search_type in ("keyword", "manual") and params.get("query"):
+        return normalize_query(str(params["query"]))
+    if search_type == "genre" and "category_id" in params:
+        return f"genre:{params['category_id']}"
+    if search_type == "year" and "year" in params:
+        return str(params["year"])
+    return "unknown"
+
+
+def _display_query(doc: dict) -> str:
+    """Текст запроса для показа: исходное написание последнего запроса"""
+    if doc["search_type"] in ("keyword", "manual") and doc["params"].get("query"):
+        return " ".join(str(doc["params"]["query"]).split())
+    return doc["query_key"]
+
+
+def _ensure_timestamp_index() -> None:
+    """Индекс по timestamp с нужным сроком хранения
+
+    Если индекс уже есть с другими параметрами (обычный индекс прежних версий или другой
+    LOG_RETENTION_DAYS), create_index завершится конфликтом — срок меняется через collMod,
+    а если это невозможно, индекс пересоздаётся.
+    """
+    ttl = settings.LOG_RETENTION_DAYS * 86400 if settings.LOG_RETENTION_DAYS > 0 else None
+    indexes = _collection.index_information()
+    # Обычный индекс по убыванию из прежней версии дублирует timestamp_1
+    if "timestamp_-1" in indexes:
+        _collection.drop_index("timestamp_-1")
+    existing = indexes.get("timestamp_1")
+    if existing is None:
+        if ttl:
+            _collection.create_index("timestamp", expireAfterSeconds=ttl)
+        else:
+            _collection.create_index("timestamp")
+        return
+    if existing.get("expireAfterSeconds") == ttl:
+        return
+    if ttl:
+        try:
+            _collection.database.command(
+                "collMod", _collection.name,
+                index={"keyPattern": {"timestamp": 1}, "expireAfterSeconds": ttl},
+            )
+            return
+        except Exception as e:
+            # Старые версии MongoDB не превращают обычный индекс в TTL через collMod
+            print("Mongo log TTL collMod error, recreating index:", e)
+    _collection.drop_index("timestamp_1")
+    if ttl:
+        _collection.create_index("timestamp", expireAfterSeconds=ttl)
+    else:
+        _collection.create_index("timestamp")
+
+
+def _ensure_log_indexes() -> None:
+    """Индексы логов: группировка по ключу запроса и выборки по времени идут по индексу
+
+    Индекс по timestamp — TTL: MongoDB сам удаляет логи старше LOG_RETENTION_DAYS.
+    """
+    global _log_indexed, _log_index_retry_at
+    if _log_indexed or time.monotonic() < _log_index_retry_at:
+        return
+    try:
+        _collection.create_index([("query_key", 1), ("timestamp", -1)])
+        _ensure_timestamp_index()
+    except Exception as e:
+        # Логи пишутся и без индексов; попытка повторится через минуту
+        print("Mongo log index error:", e)
+        _log_index_retry_at = time.monotonic() + 60
+        return
+    _log_indexed = True
+
+
+def bucket_start(moment: datetime, granularity: str) -> datetime:
+    """Начало почасового или посуточного интервала, в который попадает moment (UTC)"""
+    moment = moment.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        moment = moment.replace(hour=0)
+    return moment
+
+
+def _expires_at(granularity: str, start: datetime) -> datetime:
+    """Интервал хранится срок хранения после своего окончания"""
+    length, retention = BUCKETS[granularity]
+    return start + length + retention
+
+
+def _ensure_bucket_indexes() -> None:
+    """Уникальный индекс интервала (он же — для выборки окна) и TTL по expires_at"""
+    global _buckets_indexed
+    if _buckets_indexed:
+        return
+    _buckets.create_index([("granularity", 1), ("start", -1), ("query_key", 1)], unique=True)
+    _buckets.create_index("expires_at", expireAfterSeconds=0)
+    _buckets_indexed = True
+
+
+def _update_buckets(batch: list[dict]) -> None:
+    """Прибавляет запросы пачки к почасовым и посуточным счётчикам"""
+    grouped: dict[tuple[str, datetime, str], dict] = {}
+    for doc in batch:
+        for granularity in BUCKETS:
+            key = (granularity, bucket_start(doc["timestamp"], granularity), doc["query_key"])
+            entry = grouped.setdefault(key, {"count": 0, "doc": doc})
+            entry["count"] += 1
+            if doc["timestamp"] >= entry["doc"]["timestamp"]:
+                entry["doc"] = doc
+    requests = [
+        UpdateOne(
+            {"granularity": granularity, "start": start, "query_key": key},
+            {
+                "$inc": {"count": entry["count"]},
+                "$max": {"latest": entry["doc"]["timestamp"]},
+                "$set": {
+                    "query": _display_query(entry["doc"]),
+                    "search_type": entry["doc"]["search_type"],
+                    "params": entry["doc"]["params"],
+                },
+                "$setOnInsert": {"expires_at": _expires_at(granularity, start)},
+            },
+            upsert=True,
+        )
+        for (granularity, start, key), entry in grouped.items()
+    ]
+    _ensure_bucket_indexes()
+    _buckets.bulk_write(requests, ordered=False)
+
+
+def _ensure_rollup_indexes() -> None:
+    """Индексы сводки: топ по числу запросов и по времени последнего запроса читаются по индексу"""
+    global _rollup_indexed
+    if _rollup_indexed:
+        return
+    _rollup.create_index([("count", -1), ("latest", -1)])
+    _rollup.create_index([("latest", -1)])
+    _rollup_indexed = True
+
+
+def _update_rollup(batch: list[dict]) -> None:
+    """Обновляет сводку по запросам пачки: $inc числа запросов и $max времени последнего"""
+    grouped: dict[str, dict] = {}
+    for doc in batch:
+        entry = grouped.setdefault(doc["query_key"], {"count": 0, "doc": doc})
+        entry["count"] += 1
+        if doc["timestamp"] >= entry["doc"]["timestamp"]:
+            entry["doc"] = doc
+    requests = [
+        UpdateOne(
+            {"_id": key},
+            {
+                "$inc": {"count": entry["count"]},
+                "$max": {"latest": entry["doc"]["timestamp"]},
+                "$set": {
+                    "query": _display_query(entry["doc"]),
+                    "search_type": entry["doc"]["search_type"],
+                    "params": entry["doc"]["params"],
+                },
+            },
+            upsert=True,
+        )
+        for key, entry in grouped.items()
+    ]
+    _ensure_rollup_indexes()
+    _rollup.bulk_write(requests, ordered=False)
+
+
+def _write_batch(batch: list[dict]) -> None:
     _init_mongo()
     if _collection is None:
+        _writer_stats["errors"] += len(batch)
         return
     try:
-        _collection.insert_one({
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "search_type": search_type,
-            "params": params,
-        })
+        _ensure_log_indexes()
+        _collection.insert_many(batch, ordered=False)
+        _writer_stats["written"] += len(batch)
+        _writer_stats["batches"] += 1
     except Exception as e:
+        _writer_stats["errors"] += len(batch)
         print("Mongo log_search_keyword error:", e)
+        return
+    try:
+        _update_rollup(batch)
+    except Exception as e:
+        _writer_stats["rollup_errors"] += 1
+        print("Mongo query rollup error:", e)
+    try:
+        _update_buckets(batch)
+    except Exception as e:
+        _writer_stats["bucket_errors"] += 1
+        print("Mongo query buckets error:", e)
 
 
+def _ensure_stats_index() -> None:
+    """Уникальный индекс по film_id: upsert находит документ по индексу, а не сканированием"""
+    global _stats_indexed, _stats_index_retry_at
+    if _stats_indexed or time.monotonic() < _stats_index_retry_at:
+        return
+    try:
+        _stats.create_index("film_id", unique=True)
+    except Exception as e:
+        print("Mongo stats index error:", e)
+        # Дубликаты film_id от прежних upsert без индекса (код 11000) повтором не исправить —
+        # показы всё равно пишутся, просто без ускорения; прочие ошибки повторяются через минуту
+        if getattr(e, "code", None) != 11000:
+            _stats_index_retry_at = time.monotonic() + 60
+            return
+    _stats_indexed = True
 
-def log_films_id(ids: list[int]) -> None:
-    """Логирует статистику просмотров фильмов"""
+
+def _flush_impressions() -> None:
+    """Пишет накопленные показы одним bulk_write"""
+    global _impressions, _impressions_flushed_at
+    _impressions_flushed_at = time.monotonic()
+    with _impressions_lock:
+        pending, _impressions = _impressions, {}
+    if not pending:
+        return
     _init_mongo()
     if _stats is None:
+        _impression_stats["errors"] += 1
         return
-    now = datetime.now(timezone.utc).astimezone().isoformat()
+    requests = [
+        UpdateOne(
+            {"film_id": film_id},
+            {"$inc": {"search_impressions": count}, "$set": {"last_seen_at": last_seen_at}},
+            upsert=True,
+        )
+        for film_id, (count, last_seen_at) in pending.items()
+    ]
+    _ensure_stats_index()
+    try:
+        _stats.bulk_write(requests, ordered=False)
+        _impression_stats["flushes"] += 1
+        _impression_stats["upserts"] += len(requests)
+        _impression_stats["flushed_impressions"] += sum(count for count, _ in pending.values())
+    except Exception as e:
+        _impression_stats["errors"] += 1
+        print("Mongo log_films_id error:", e)
+
+
+def _maybe_flush_impressions() -> None:
+    if time.monotonic() - _impressions_flushed_at >= settings.IMPRESSION_FLUSH_INTERVAL:
+        _flush_impressions()
 
-    for film_id in ids:
+
+def _drain(batch: list[dict]) -> None:
+    """Добирает в пачку всё, что уже лежит в очереди, не больше LOG_BATCH_SIZE"""
+    while len(batch) < settings.LOG_BATCH_SIZE:
         try:
-            _stats.update_one(
-                {"film_id": film_id},
-                {
-                    "$inc": {"search_impressions": 1},
-                    "$set": {"last_seen_at": now},
-                },
-                upsert=True,
-            )
-        except Exception as e:
-            print(e)
\ No newline at end of file
+            batch.append(_queue.get_nowait())
+        except queue.Empty:
+            return
+
+
+def _run() -> None:
+    while not _stopping.is_set():
+        _maybe_flush_impressions()
+        try:
+            batch = [_queue.get(timeout=settings.LOG_FLUSH_INTERVAL)]
+        except queue.Empty:
+            continue
+        # Ждём до LOG_FLUSH_INTERVAL, пока наберётся полная пачка
+        deadline = time.monotonic() + settings.LOG_FLUSH_INTERVAL
+        _drain(batch)
+        while len(batch) < settings.LOG_BATCH_SIZE and not _stopping.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+            _drain(batch)
+        _write_batch(batch)
+    _flush_all()
+
+
+def _flush_all() -> None:
+    """Записывает всё, что осталось в очереди, и накопленные показы"""
+    _flush_impressions()
+    while True:
+        batch: list[dict] = []
+        _drain(batch)
+        if not batch:
+            return
+        _write_batch(batch)
+
+
+def _ensure_flusher() -> None:
+    global _flusher
+    if _flusher is not None:
+        return
+    with _flusher_lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_run, name="search-log-writer", daemon=True)
+            _flusher.start()
+
+
+def log_search_keyword(search_type: str, params: dict):
+    """Ставит поисковый запрос в очередь записи в MongoDB; при переполнении запись отбрасывается"""
+    if _stopping.is_set():
+        _writer_stats["dropped"] += 1
+        return
+    _ensure_flusher()
+    try:
+        _queue.put_nowait({
+            # datetime сохраняется как BSON date: сравнение и выборки по времени без разбора строк
+            "timestamp": datetime.now(timezone.utc),
+            "search_type": search_type,
+            "query_key": query_key(search_type, params),
+            "params": params,
+            # Запись учитывается в сводке при записи пачки; построение сводки по старым логам её пропускает
+            "in_rollup": True,
+        })
+        _writer_stats["queued"] += 1
+    except queue.Full:
+        _writer_stats["dropped"] += 1
+
+
+def stop_log_writer(timeout: float = 5.0) -> None:
+    """Останавливает фоновую запись и сбрасывает накопленные записи (при остановке приложения)"""
+    _stopping.set()
+    if _flusher is not None:
+        _flusher.join(timeout)
+    else:
+        _flush_all()
+
+
+def get_log_writer_stats() -> dict:
+    """Счётчики очереди записи поисковых запросов и накопленных показов"""
+    with _impressions_lock:
+        pending_films = len(_impressions)
+    return {
+        **_writer_stats,
+        "pending": _queue.qsize(),
+        "capacity": settings.LOG_QUEUE_SIZE,
+        "running": _flusher is not None and _flusher.is_alive(),
+        "impressions": {
+            **_impression_stats,
+            "pending_films": pending_films,
+            "flush_interval": settings.IMPRESSION_FLUSH_INTERVAL,
+        },
+    }
+
+
+def log_films_id(ids: list[int]) -> None:
+    """Учитывает показы фильмов в выдаче; в MongoDB они уходят в фоне суммарными приращениями"""
+    if not ids:
+        return
+    if _stopping.is_set():
+        return
+    _ensure_flusher()
+    now = datetime.now(timezone.utc).astimezone().isoformat()
+    with _impressions_lock:
+        for film_id in ids:
+            count, _ = _impressions.get(film_id, (0, now))
+            _impressions[film_id] = (count + 1, now)
+        _impression_stats["impressions"] += len(ids)
@@ -1,19 +1,69 @@
-def paginate(fetch_items, fetch_total, **kwargs):
-    """Универсальная функция пагинации
-    fetch_items: функция для получения элементов с параметрами limit, offset и т.д.
-    fetch_total: функция для получения общего количества (без limit/offset)
-    Возвращает словарь с items, total, offset, limit, count
-    """
-    items = fetch_items(**kwargs)
+import asyncio
+import base64
+import json
+
+
+class InvalidCursor(ValueError):
+    """Курсор пагинации повреждён или не подходит к запросу"""
+
+
+def encode_cursor(release_year: int, film_id: int) -> str:
+    """Кодирует позицию (release_year, film_id) в непрозрачный токен"""
+    raw = json.dumps([release_year, film_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[int, int]:
+    """Декодирует токен курсора обратно в (release_year, film_id)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        year, film_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return int(year), int(film_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Invalid pagination cursor") from e
+
+
+def _split_kwargs(kwargs: dict) -> tuple[bool, dict, dict]:
+    """Разделяет параметры на аргументы fetch_items и fetch_total"""
+    keyset = "cursor" in kwargs
+    cursor = kwargs.pop("cursor", None)
+    item_kwargs = dict(kwargs)
+    if keyset:
+        item_kwargs["after"] = decode_cursor(cursor) if cursor else None
+        if cursor:
+            item_kwargs["offset"] = 0
     # Удаление параметров limit и offset для fetch_total, поскольку они им не нужны.
     total_kwargs = {k: v for k, v in kwargs.items() if k not in ('limit', 'offset')}
-    total = fetch_total(**total_kwargs)
+    return keyset, item_kwargs, total_kwargs
+
+
+def _page(items: list, total: int, kwargs: dict, keyset: bool) -> dict:
+    """kwargs — аргументы fetch_items: при переданном курсоре offset в них уже 0"""
     offset = kwargs.get('offset', 0)
     limit = kwargs.get('limit', 10)
-    return {
+    result = {
         "items": items,
         "total": total,
         "offset": offset,
         "limit": limit,
         "count": len(items)
     }
+    if keyset:
+        last = items[-1] if len(items) == limit else None
+        result["next_cursor"] = encode_cursor(last["release_year"], last["film_id"]) if last else None
+    return result
+
+
+async def apaginate(fetch_items, fetch_total, **kwargs):
+    """Универсальная функция пагинации для корутин из db/my_sql_async.py
+    fetch_items: функция для получения элементов с параметрами limit, offset и т.д.
+    fetch_total: функция для получения общего количества (без limit/offset)
+    fetch_items и fetch_total выполняются одновременно на разных соединениях пула,
+    поэтому страница стоит одного сетевого ожидания вместо двух.
+    Если передан параметр cursor, используется keyset-пагинация: fetch_items получает
+    after=(release_year, film_id) вместо offset, а в ответ добавляется next_cursor.
+    Возвращает словарь с items, total, offset, limit, count
+    """
+    keyset, item_kwargs, total_kwargs = _split_kwargs(kwargs)
+    items, total = await asyncio.gather(fetch_items(**item_kwargs), fetch_total(**total_kwargs))
+    return _page(items, total, item_kwargs, keyset)
@@ -1,67 +1,279 @@
 import json
 import os
+import sqlite3
 import threading
 import time
-import random
 
-CACHE_FILE = os.path.join(os.path.dirname(__file__), "poster_cache.json")
+from utils.text import normalize_name as normalize_title
+
+# Кэш хранится в SQLite: вставка — одна строка в индексе, без перезаписи всего файла.
+# Файл общий для всех процессов uvicorn на хосте: промах в памяти процесса
+# проверяется по базе, куда могли записать другие воркеры.
+CACHE_DB = os.path.join(os.path.dirname(__file__), "poster_cache.db")
+# Прежний формат (один JSON-документ) — импортируется один раз при первом запуске
+LEGACY_CACHE_FILE = os.path.join(os.path.dirname(__file__), "poster_cache.json")
+
 _lock = threading.Lock()
-_cache: dict = {}
+# film_id -> (url, время записи)
+_by_film: dict[int, tuple[str, float]] = {}
+# Нормализованное название -> (url, время записи) по записям film_posters: только для поиска по названию
+_by_title: dict[str, tuple[str, float]] = {}
+# Записи старого формата без film_id (title_posters) — единственный запасной вариант для фильма без своей записи
+_legacy_by_title: dict[str, tuple[str, float]] = {}
+_conn: sqlite3.Connection | None = None
+_loaded = False
+_stats = {
+    "memory_hits": 0,
+    "shared_hits": 0,
+    "title_hits": 0,
+    "misses": 0,
+    "writes": 0,
+    "batches": 0,
+}
+
 
+def _connect() -> sqlite3.Connection:
+    # timeout — ожидание блокировки, пока пишет другой процесс
+    conn = sqlite3.connect(CACHE_DB, timeout=5, check_same_thread=False, isolation_level=None)
+    # WAL + synchronous=NORMAL: фиксация вставки не ждёт fsync
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS film_posters (
+            film_id INTEGER PRIMARY KEY,
+            title_key TEXT NOT NULL,
+            url TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS film_posters_title_key ON film_posters (title_key)")
+    # Записи по названию без film_id (из прежних версий кэша)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS title_posters (
+            title_key TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    """)
+    # Аренды фоновых задач, которые должен выполнять только один воркер на хосте
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS leases (
+            name TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )
+    """)
+    return conn
 
-def _load_cache() -> None:
-    global _cache
-    if os.path.exists(CACHE_FILE):
+
+def _import_legacy(conn: sqlite3.Connection) -> None:
+    """Переносит записи по названию из прежних форматов в title_posters"""
+    if conn.execute("SELECT 1 FROM title_posters LIMIT 1").fetchone():
+        return
+    now = time.time()
+    rows = []
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'posters'").fetchone():
+        rows = conn.execute("SELECT title, url, updated_at FROM posters").fetchall()
+    elif os.path.exists(LEGACY_CACHE_FILE):
+        try:
+            with open(LEGACY_CACHE_FILE, "r", encoding="utf-8") as f:
+                rows = [(title, url, now) for title, url in json.load(f).items()]
+        except (json.JSONDecodeError, OSError) as e:
+            print("Poster cache legacy import error:", e)
+    rows = [(normalize_title(title), url, updated_at) for title, url, updated_at in rows if title and url]
+    if not rows:
+        return
+    _write_many(conn, "INSERT OR IGNORE INTO title_posters (title_key, url, updated_at) VALUES (?, ?, ?)", rows)
+    print(f"Imported {len(rows)} posters keyed by title")
+
+
+def _ensure_loaded() -> None:
+    """Открывает базу при первом обращении и читает её построчно, а не при импорте модуля"""
+    global _conn, _loaded
+    if _loaded:
+        return
+    with _lock:
+        if _loaded:
+            return
         try:
-            with open(CACHE_FILE, "r", encoding="utf-8") as f:
-                _cache = json.load(f)
-        except (json.JSONDecodeError, OSError, IOError):
-            _cache = {}
-    else:
-        _cache = {}
+            _conn = _connect()
+            _import_legacy(_conn)
+            for title_key, url, updated_at in _conn.execute("SELECT title_key, url, updated_at FROM title_posters"):
+                _legacy_by_title[title_key] = (url, updated_at)
+            for film_id, title_key, url, updated_at in _conn.execute(
+                "SELECT film_id, title_key, url, updated_at FROM film_posters"
+            ):
+                _by_film[film_id] = (url, updated_at)
+                _by_title[title_key] = (url, updated_at)
+        except sqlite3.Error as e:
+            # Без файла кэш продолжает работать в памяти процесса
+            print("Poster cache open error:", e)
+            _conn = None
+        _loaded = True
 
 
-_load_cache()
+def _write_many(conn: sqlite3.Connection, sql: str, rows: list[tuple]) -> None:
+    """executemany одной транзакцией (соединение открыто в режиме autocommit)"""
+    conn.execute("BEGIN")
+    try:
+        conn.executemany(sql, rows)
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
 
 
-def get(title: str) -> str | None:
-    if not title:
-        return None
-    return _cache.get(title)
+def _placeholders(values) -> str:
+    return ", ".join(["?"] * len(values))
 
 
-def set(title: str, url: str) -> None:
-    if not title:
+def _read_shared(film_ids: list[int]) -> None:
+    """Подтягивает записи, которые могли записать другие воркеры; вызывается под _lock"""
+    if _conn is None or not film_ids:
         return
+    try:
+        rows = _conn.execute(
+            f"SELECT film_id, title_key, url, updated_at FROM film_posters WHERE film_id IN ({_placeholders(film_ids)})",
+            film_ids,
+        ).fetchall()
+    except sqlite3.Error as e:
+        print("Poster cache read error:", e)
+        return
+    for film_id, title_key, url, updated_at in rows:
+        _by_film[film_id] = (url, updated_at)
+        _by_title[title_key] = (url, updated_at)
+
+
+def get_many(films: list[dict], legacy_fallback: bool = True) -> dict[int, tuple[str, float]]:
+    """Записи кэша для страницы фильмов одной операцией: film_id -> (url, время записи)
+
+    films — словари с film_id и title. Фильм без своей записи получает запись старого
+    формата (title_posters) по нормализованному названию, если legacy_fallback;
+    записи других фильмов с тем же названием не используются. Фильмов без записи нет в результате.
+    """
+    _ensure_loaded()
+    found: dict[int, tuple[str, float]] = {}
+    with _lock:
+        _stats["batches"] += 1
+        missing = {film["film_id"] for film in films if film["film_id"] not in _by_film}
+        _stats["memory_hits"] += len(films) - len(missing)
+        _read_shared(list(missing))
+        for film in films:
+            film_id = film["film_id"]
+            entry = _by_film.get(film_id)
+            if entry is not None:
+                if film_id in missing:
+                    _stats["shared_hits"] += 1
+            else:
+                entry = _legacy_by_title.get(normalize_title(film.get("title", ""))) if legacy_fallback else None
+                _stats["title_hits" if entry is not None else "misses"] += 1
+            if entry is not None:
+                found[film_id] = entry
+    return found
+
+
+def reload_many(films: list[dict]) -> dict[int, tuple[str, float]]:
+    """Перечитывает записи из общей базы, минуя память процесса"""
+    _ensure_loaded()
     with _lock:
-        _cache[title] = url
-        
-        # Retry logic for Windows file locking issues
-        max_retries = 3
-        for attempt in range(max_retries):
+        _read_shared([film["film_id"] for film in films])
+        return {film["film_id"]: _by_film[film["film_id"]] for film in films if film["film_id"] in _by_film}
+
+
+def set_many(entries: list[tuple[int, str, str]]) -> None:
+    """Сохраняет (film_id, title, url) одной транзакцией"""
+    if not entries:
+        return
+    _ensure_loaded()
+    now = time.time()
+    rows = [(film_id, normalize_title(title), url, now) for film_id, title, url in entries]
+    with _lock:
+        for film_id, title_key, url, _ in rows:
+            _by_film[film_id] = (url, now)
+            _by_title[title_key] = (url, now)
+        _stats["writes"] += len(rows)
+        if _conn is None:
+            return
+        try:
+            _write_many(
+                _conn,
+                "INSERT OR REPLACE INTO film_posters (film_id, title_key, url, updated_at) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+        except sqlite3.Error as e:
+            print("Poster cache write error:", e)
+
+
+def get_by_title(title: str) -> tuple[str, float] | None:
+    """Запись любого фильма с таким нормализованным названием (поиск по названию, не по фильму)"""
+    _ensure_loaded()
+    key = normalize_title(title)
+    with _lock:
+        return _by_title.get(key) or _legacy_by_title.get(key)
+
+
+def get_entry(film_id: int, title: str) -> tuple[str, float] | None:
+    """Запись кэша для одного фильма или None"""
+    return get_many([{"film_id": film_id, "title": title}]).get(film_id)
+
+
+def set(film_id: int, title: str, url: str) -> None:
+    set_many([(film_id, title, url)])
+
+
+def acquire_lease(name: str, owner: str, ttl: float) -> bool:
+    """Берёт или продлевает аренду name на ttl секунд; False, если её держит другой воркер
+
+    Без общей базы процесс считается единственным и аренда всегда выдаётся.
+    """
+    _ensure_loaded()
+    now = time.time()
+    with _lock:
+        if _conn is None:
+            return True
+        try:
+            _conn.execute("BEGIN IMMEDIATE")
             try:
-                dirpath = os.path.dirname(CACHE_FILE)
-                if not os.path.exists(dirpath):
-                    os.makedirs(dirpath, exist_ok=True)
-                
-                # Use unique temp filename to avoid conflicts
-                timestamp = int(time.time() * 1000)
-                random_suffix = random.randint(1000, 9999)
-                tmp_name = f"tmp_cache_{timestamp}_{random_suffix}"
-                tmp_path = os.path.join(dirpath, tmp_name)
-                
-                with open(tmp_path, "w", encoding="utf-8") as f:
-                    json.dump(_cache, f, ensure_ascii=False, indent=2)
-                
-                # Small delay to ensure file is written
-                time.sleep(0.01)
-                
-                os.replace(tmp_path, CACHE_FILE)
-                break  # Success, exit retry loop
-                
-            except Exception as e:
-                if attempt == max_retries - 1:
-                    print(f"Poster cache write error after {max_retries} attempts:", e)
-                else:
-                    # Brief wait before retry
-                    time.sleep(0.05 * (attempt + 1))
+                _conn.execute(
+                    """
+                    INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?)
+                    ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+                    WHERE leases.owner = excluded.owner OR leases.expires_at < ?
+                    """,
+                    (name, owner, now + ttl, now),
+                )
+                holder = _conn.execute("SELECT owner FROM leases WHERE name = ?", (name,)).fetchone()
+            except BaseException:
+                _conn.execute("ROLLBACK")
+                raise
+            _conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            print("Poster cache lease error:", e)
+            return False
+    return holder is not None and holder[0] == owner
+
+
+def release_lease(name: str, owner: str) -> None:
+    """Освобождает аренду, если она принадлежит owner"""
+    _ensure_loaded()
+    with _lock:
+        if _conn is None:
+            return
+        try:
+            _conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+        except sqlite3.Error as e:
+            print("Poster cache lease error:", e)
+
+
+def get_stats() -> dict:
+    """Попадания в память процесса, в общую базу, по названию и промахи"""
+    lookups = _stats["memory_hits"] + _stats["shared_hits"] + _stats["title_hits"] + _stats["misses"]
+    hits = lookups - _stats["misses"]
+    return {
+        **_stats,
+        "hit_ratio": hits / lookups if lookups else 0.0,
+        "size": len(_by_film),
+        "title_index_size": len(_by_title),
+        "legacy_size": len(_legacy_by_title),
+        "shared": _conn is not None,
+    }
@@ -0,0 +1,143 @@
+import itertools
+import os
+import queue
+import threading
+import time
+
+from settings import settings
+
+# Приоритеты очереди: промахи из запросов обгоняют прогрев каталога
+URGENT = 0
+WARMUP = 1
+
+_queue: queue.PriorityQueue = queue.PriorityQueue()
+_seq = itertools.count()
+_lock = threading.Lock()
+# film_id -> приоритет, с которым он сейчас стоит в очереди
+_queued: dict[int, int] = {}
+_worker: threading.Thread | None = None
+_stats = {
+    "enqueued": 0,
+    "dropped": 0,
+    "fetched": 0,
+    "skipped": 0,
+    "errors": 0,
+    "warmup_films": 0,
+    "warmup_leader": False,
+}
+
+# Прогрев каталога выполняет один воркер на хосте: остальные ждут аренды в poster_cache.db,
+# иначе N воркеров запрашивали бы одни и те же фильмы с N-кратной частотой
+WARMUP_LEASE = "poster_warmup"
+_owner = f"{os.getpid()}-{id(_stats)}"
+
+
+def enqueue(film_id: int, title: str, urgent: bool = False) -> bool:
+    """Ставит фильм в очередь фоновой загрузки постеров; повторные постановки игнорируются"""
+    if not title:
+        return False
+    priority = URGENT if urgent else WARMUP
+    with _lock:
+        current = _queued.get(film_id)
+        if current is not None and current <= priority:
+            return False
+        if current is None and len(_queued) >= settings.POSTER_PREFETCH_QUEUE_SIZE:
+            _stats["dropped"] += 1
+            return False
+        # Повышение приоритета: старая запись останется в очереди и будет пропущена
+        _queued[film_id] = priority
+        _stats["enqueued"] += 1
+    _queue.put((priority, next(_seq), film_id, title))
+    return True
+
+
+def _take() -> tuple[int, str]:
+    while True:
+        priority, _, film_id, title = _queue.get()
+        with _lock:
+            if _queued.get(film_id) == priority:
+                del _queued[film_id]
+                return film_id, title
+
+
+def _run() -> None:
+    from utils.tmdb import fetch_poster, needs_fetch, retry_after
+
+    interval = 1 / settings.POSTER_PREFETCH_RATE if settings.POSTER_PREFETCH_RATE > 0 else 0
+    next_slot = 0.0
+    while True:
+        film_id, title = _take()
+        try:
+            # Постер мог появиться, пока название ждало в очереди (в том числе от другого воркера)
+            if not needs_fetch(film_id, title):
+                _stats["skipped"] += 1
+                continue
+            # Не быстрее POSTER_PREFETCH_RATE запросов к TMDB в секунду
+            # и не раньше, чем размыкатель снова пропустит запрос
+            delay = max(next_slot - time.monotonic(), retry_after())
+            if delay > 0:
+                time.sleep(delay)
+            next_slot = time.monotonic() + interval
+            fetch_poster(film_id, title)
+            _stats["fetched"] += 1
+        except Exception as e:
+            _stats["errors"] += 1
+            print(f"Poster prefetch error for {title}: {e}")
+
+
+def _warmup_pending() -> int:
+    with _lock:
+        return sum(1 for priority in _queued.values() if priority == WARMUP)
+
+
+def _warm_up(load_films) -> None:
+    from utils.poster_cache import acquire_lease, release_lease
+    from utils.tmdb import missing_posters
+
+    ttl = settings.POSTER_WARMUP_LEASE_TTL
+    # Ждём, пока аренду не освободит (или не перестанет продлевать) другой воркер
+    while not acquire_lease(WARMUP_LEASE, _owner, ttl):
+        time.sleep(ttl / 2)
+    _stats["warmup_leader"] = True
+    try:
+        try:
+            films = load_films()
+        except Exception as e:
+            print("Poster prefetch warm-up error:", e)
+            return
+        _stats["warmup_films"] = len(films)
+        # Весь каталог проверяется по кэшу одной операцией
+        for film in missing_posters(films):
+            enqueue(film["film_id"], film["title"])
+        # Аренда продлевается, пока очередь прогрева не разобрана
+        while _warmup_pending():
+            time.sleep(ttl / 3)
+            acquire_lease(WARMUP_LEASE, _owner, ttl)
+    finally:
+        _stats["warmup_leader"] = False
+        release_lease(WARMUP_LEASE, _owner)
+
+
+def start_prefetcher(load_films) -> None:
+    """Запускает фоновую загрузку постеров
+
+    load_films — функция, возвращающая фильмы всего каталога (film_id, title)
+    в порядке прогрева: сначала популярные и новые.
+    """
+    global _worker
+    if not settings.POSTER_PREFETCH or _worker is not None:
+        return
+    _worker = threading.Thread(target=_run, name="poster-prefetch", daemon=True)
+    _worker.start()
+    threading.Thread(target=_warm_up, args=(load_films,), name="poster-warmup", daemon=True).start()
+
+
+def get_stats() -> dict:
+    """Счётчики очереди фоновой загрузки постеров"""
+    with _lock:
+        return {
+            **_stats,
+            "queued": len(_queued),
+            "rate": settings.POSTER_PREFETCH_RATE,
+            "running": _worker is not None,
+        }
@@ -0,0 +1,194 @@
+import hashlib
+import io
+import os
+import tempfile
+import threading
+
+from settings import settings
+
+try:
+    from PIL import Image
+except ImportError:  # без Pillow отдаём только оригинальный размер
+    Image = None
+
+# Ширина вариантов в пикселях; ORIGINAL_SIZE — то, что скачивается из TMDB (w500)
+SIZES = {"w92": 92, "w185": 185, "w342": 342, "w500": 500}
+ORIGINAL_SIZE = "w500"
+
+_lock = threading.Lock()
+# Файлы общие для всех воркеров uvicorn: наличие файла и порядок LRU (по mtime) берутся с диска,
+# а не из памяти процесса. ETag кэшируется по (inode, размер) — замена файла меняет inode.
+_etags: dict[str, tuple[tuple[int, int], str]] = {}
+_usage = {"files": 0, "bytes": 0}
+_scanned = False
+_stats = {
+    "hits": 0,
+    "downloads": 0,
+    "resizes": 0,
+    "evictions": 0,
+    "evicted_bytes": 0,
+}
+
+
+def _etag(data: bytes) -> str:
+    return '"' + hashlib.sha256(data).hexdigest()[:32] + '"'
+
+
+def _filename(film_id: int, size: str) -> str:
+    return f"{film_id}_{size}.jpg"
+
+
+def _cached_etag(name: str, stat: os.stat_result, read) -> str:
+    key = (stat.st_ino, stat.st_size)
+    with _lock:
+        cached = _etags.get(name)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    etag = _etag(read())
+    with _lock:
+        _etags[name] = (key, etag)
+    return etag
+
+
+def _touch(name: str) -> tuple[str, str] | None:
+    """Отмечает обращение к файлу; возвращает (путь, ETag) или None, если файла нет"""
+    path = os.path.join(settings.POSTER_STORE_DIR, name)
+    try:
+        # mtime хранит порядок LRU для всех воркеров и между перезапусками
+        os.utime(path)
+        stat = os.stat(path)
+
+        def read() -> bytes:
+            with open(path, "rb") as f:
+                return f.read()
+
+        return path, _cached_etag(name, stat, read)
+    except FileNotFoundError:
+        with _lock:
+            _etags.pop(name, None)
+        return None
+
+
+def _enforce_budget(keep: str) -> None:
+    """Пересчитывает занятое место по диску и удаляет давно не использованные файлы сверх бюджета
+
+    Каталог сканируется при каждой записи: так учитываются файлы всех воркеров.
+    Записи редки (только промахи), поэтому scandir дешевле скачивания постера.
+    """
+    global _scanned
+    entries = []
+    for entry in os.scandir(settings.POSTER_STORE_DIR):
+        if not entry.name.endswith(".jpg"):
+            continue
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, entry.name, stat.st_size))
+    total = sum(size for _, _, size in entries)
+    files = len(entries)
+    for _, name, size in sorted(entries):
+        if total <= settings.POSTER_STORE_MAX_BYTES:
+            break
+        if name == keep:
+            continue
+        try:
+            os.remove(os.path.join(settings.POSTER_STORE_DIR, name))
+        except FileNotFoundError:
+            # Файл уже удалил другой воркер
+            pass
+        else:
+            _stats["evictions"] += 1
+            _stats["evicted_bytes"] += size
+        total -= size
+        files -= 1
+        with _lock:
+            _etags.pop(name, None)
+    with _lock:
+        _usage["files"] = files
+        _usage["bytes"] = total
+        _scanned = True
+
+
+def _store(name: str, data: bytes) -> tuple[str, str]:
+    """Атомарно записывает файл и вытесняет давно не использованные, если превышен бюджет"""
+    os.makedirs(settings.POSTER_STORE_DIR, exist_ok=True)
+    path = os.path.join(settings.POSTER_STORE_DIR, name)
+    # Уникальное временное имя: один и тот же файл могут записывать несколько процессов
+    fd, tmp_path = tempfile.mkstemp(dir=settings.POSTER_STORE_DIR, prefix=f"{name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    etag = _cached_etag(name, os.stat(path), lambda: data)
+    _enforce_budget(keep=name)
+    return path, etag
+
+
+def _resize(data: bytes, width: int) -> bytes:
+    with Image.open(io.BytesIO(data)) as image:
+        if image.width <= width:
+            return data
+        height = round(image.height * width / image.width)
+        thumbnail = image.convert("RGB").resize((width, height), Image.LANCZOS)
+        out = io.BytesIO()
+        thumbnail.save(out, format="JPEG", quality=85, optimize=True, progressive=True)
+        return out.getvalue()
+
+
+def find_file(film_id: int, size: str) -> tuple[str, str] | None:
+    """Уже сохранённый файл постера нужного размера и его ETag, без обращения к источнику"""
+    if Image is None:
+        size = ORIGINAL_SIZE
+    found = _touch(_filename(film_id, size))
+    if found is not None:
+        _stats["hits"] += 1
+    return found
+
+
+def get_file(film_id: int, size: str, source_url: str, download) -> tuple[str, str]:
+    """Путь к файлу постера нужного размера и его ETag
+
+    Оригинал скачивается функцией download(url) -> bytes один раз, варианты
+    меньшего размера строятся из него. Без Pillow любой размер отдаётся оригиналом.
+    """
+    if Image is None:
+        size = ORIGINAL_SIZE
+    found = find_file(film_id, size)
+    if found is not None:
+        return found
+
+    original_name = _filename(film_id, ORIGINAL_SIZE)
+    original_file = _touch(original_name) if size != ORIGINAL_SIZE else None
+    if original_file is not None:
+        with open(original_file[0], "rb") as f:
+            original = f.read()
+    else:
+        original = download(source_url)
+        _stats["downloads"] += 1
+        original_file = _store(original_name, original)
+    if size == ORIGINAL_SIZE:
+        return original_file
+
+    _stats["resizes"] += 1
+    return _store(_filename(film_id, size), _resize(original, SIZES[size]))
+
+
+def get_stats() -> dict:
+    """Счётчики дискового хранилища постеров; занятое место — по последнему сканированию каталога"""
+    if not _scanned and os.path.isdir(settings.POSTER_STORE_DIR):
+        _enforce_budget(keep="")
+    with _lock:
+        return {
+            **_stats,
+            **_usage,
+            "max_bytes": settings.POSTER_STORE_MAX_BYTES,
+            "thumbnails": Image is not None,
+        }
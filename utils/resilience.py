@@ -0,0 +1,120 @@
+import threading
+import time
+
+
+class CircuitBreaker:
+    """Размыкатель для внешнего сервиса
+
+    После failure_threshold ошибок подряд переходит в состояние open и cooldown секунд
+    отклоняет вызовы сразу. Затем пропускает один пробный вызов (half_open):
+    успех замыкает цепь, ошибка снова размыкает её.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._stats = {
+            "trips": 0,
+            "shed": 0,
+            "successes": 0,
+            "failures": 0,
+        }
+
+    def allow(self) -> bool:
+        """True, если вызов можно выполнять; иначе вызов нужно пропустить"""
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self._stats["shed"] += 1
+            return False
+
+    def release(self) -> None:
+        """Отменяет разрешённый allow() вызов, который так и не был выполнен"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._stats["successes"] += 1
+            self._failures = 0
+            self._state = self.CLOSED
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._stats["failures"] += 1
+            self._failures += 1
+            if self._state == self.HALF_OPEN or (
+                self._state == self.CLOSED and self._failures >= self.failure_threshold
+            ):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+                self._stats["trips"] += 1
+
+    def retry_after(self) -> float:
+        """Секунды до пробного вызова; 0, если вызовы уже разрешены"""
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(0.0, self.cooldown - (time.monotonic() - self._opened_at))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "state": self._state,
+                "consecutive_failures": self._failures,
+            }
+
+
+class TokenBucket:
+    """Ограничитель частоты: rate токенов в секунду, не больше capacity накопленных"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._stats = {
+            "granted": 0,
+            "limited": 0,
+        }
+
+    def try_acquire(self) -> bool:
+        """Забирает токен, если он есть; не ждёт"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self._stats["granted"] += 1
+                return True
+            self._stats["limited"] += 1
+            return False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "rate": self.rate,
+                "capacity": self.capacity,
+                "tokens": round(self._tokens, 2),
+            }
@@ -0,0 +1,8 @@
+import unicodedata
+
+
+def normalize_name(name: str) -> str:
+    """Приводит строку к виду для сравнения: нижний регистр, без диакритики, одиночные пробелы"""
+    text = unicodedata.normalize("NFKD", name or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.lower().split())
@@ -1,21 +1,291 @@
+import threading
+import time
+from concurrent.futures import Future
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
 from settings import settings
-from .poster_cache import get as get_cached_poster, set as set_cached_poster
+from .poster_cache import get_many as get_cached_many, reload_many as reload_cached_many, set_many as set_cached_many
+from .poster_prefetch import enqueue as enqueue_prefetch
+from .resilience import CircuitBreaker, TokenBucket
 
-TMDB_SEARCH_URL = "https://api.themoviedb.org/3/search/multi"
+# TMDB_BASE_URL можно направить на локальную заглушку для тестов
+TMDB_SEARCH_URL = f"{settings.TMDB_BASE_URL.rstrip('/')}/search/multi"
 POSTER_BASE_URL = "https://image.tmdb.org/t/p/w500"
+NO_POSTER_URL = "/static/images/no-poster.svg"
 
 TMDB_API_KEY = settings.TMDB_API_KEY
 
+_stats_lock = threading.Lock()
+_stats = {
+    "requests": 0,
+    "errors": 0,
+    "request_seconds": 0.0,
+    "attempts": 0,  # отправленные HTTP-запросы, включая повторы urllib3
+    "connections": 0,  # успешно установленные соединения
+    "connect_errors": 0,
+    "connect_seconds": 0.0,
+    "coalesced": 0,  # запросы, не ушедшие в TMDB благодаря объединению
+    "image_downloads": 0,  # скачивания изображений для /posters, не входят в requests
+    "image_errors": 0,
+    "image_seconds": 0.0,
+}
+
+# Общие для процесса: размыкатель при серии ошибок TMDB и ограничитель частоты запросов
+_breaker = CircuitBreaker(
+    failure_threshold=settings.TMDB_BREAKER_FAILURES,
+    cooldown=settings.TMDB_BREAKER_COOLDOWN,
+)
+_limiter = TokenBucket(settings.TMDB_RATE_LIMIT, settings.TMDB_RATE_BURST) if settings.TMDB_RATE_LIMIT > 0 else None
+
+# Запросы к TMDB, выполняющиеся прямо сейчас: title -> Future с результатом
+_inflight_lock = threading.Lock()
+_inflight: dict[str, Future] = {}
+
+
+def _count(**deltas) -> None:
+    with _stats_lock:
+        for key, value in deltas.items():
+            _stats[key] += value
+
+
+def _timed_connect(connect) -> None:
+    """Соединение считается только после успешной установки, неудачи — отдельно"""
+    started = time.monotonic()
+    try:
+        connect()
+    except BaseException:
+        _count(connect_errors=1, connect_seconds=time.monotonic() - started)
+        raise
+    _count(connections=1, connect_seconds=time.monotonic() - started)
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    """Соединение, учитывающее время установки (DNS + TCP) и каждую попытку запроса"""
+
+    def connect(self):
+        _timed_connect(super().connect)
+
+    def request(self, *args, **kwargs):
+        result = super().request(*args, **kwargs)
+        # Учитывается только отправленный запрос: неудачное подключение попыткой не считается
+        _count(attempts=1)
+        return result
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    """Соединение, учитывающее время установки (DNS + TCP + TLS) и каждую попытку запроса"""
+
+    def connect(self):
+        _timed_connect(super().connect)
+
+    def request(self, *args, **kwargs):
+        result = super().request(*args, **kwargs)
+        # Учитывается только отправленный запрос: неудачное подключение попыткой не считается
+        _count(attempts=1)
+        return result
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+def _create_session() -> requests.Session:
+    """Общая сессия с keep-alive: соединения к TMDB переиспользуются между запросами"""
+    retry = Retry(
+        total=settings.TMDB_MAX_RETRIES,
+        backoff_factor=settings.TMDB_RETRY_BACKOFF,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+        respect_retry_after_header=False,
+    )
+    adapter = _TimedAdapter(
+        pool_connections=1,
+        pool_maxsize=settings.TMDB_POOL_SIZE,
+        pool_block=False,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+_session = _create_session()
+
 
-def get_poster_by_title(title: str) -> str:
+def _get(url: str, params: dict) -> requests.Response:
+    """GET через общую сессию с учётом времени запроса (включая повторы)"""
+    started = time.monotonic()
+    try:
+        return _session.get(url, params=params, timeout=settings.TMDB_TIMEOUT)
+    finally:
+        _count(requests=1, request_seconds=time.monotonic() - started)
+
+
+def download_image(url: str) -> bytes:
+    """Скачивает изображение постера через общую keep-alive сессию"""
+    started = time.monotonic()
+    try:
+        response = _session.get(url, timeout=settings.TMDB_TIMEOUT)
+        response.raise_for_status()
+        return response.content
+    except Exception:
+        _count(image_errors=1)
+        raise
+    finally:
+        _count(image_downloads=1, image_seconds=time.monotonic() - started)
+
+
+def retry_after() -> float:
+    """Секунды, через которые размыкатель снова пропустит запрос к TMDB"""
+    return _breaker.retry_after()
+
+
+def get_tmdb_stats() -> dict:
+    """Счётчики запросов к TMDB: сколько соединений открыто и сколько времени ушло на них"""
+    with _stats_lock:
+        stats = dict(_stats)
+    with _inflight_lock:
+        stats["inflight"] = len(_inflight)
+    stats["breaker"] = _breaker.stats()
+    stats["rate_limiter"] = _limiter.stats() if _limiter is not None else None
+    stats["avg_request_seconds"] = stats["request_seconds"] / stats["requests"] if stats["requests"] else 0.0
+    connects = stats["connections"] + stats["connect_errors"]
+    stats["avg_connect_seconds"] = stats["connect_seconds"] / connects if connects else 0.0
+    # Доля попыток, отправленных по уже открытому соединению
+    stats["reused_ratio"] = max(0.0, 1 - stats["connections"] / stats["attempts"]) if stats["attempts"] else 0.0
+    return stats
+
+
+def _is_stale(entry: tuple[str, float]) -> bool:
+    """Отрицательный результат («постера нет») устаревает через POSTER_NEGATIVE_TTL"""
+    url, updated_at = entry
+    return url == NO_POSTER_URL and time.time() - updated_at > settings.POSTER_NEGATIVE_TTL
+
+
+def _cached(films: list[dict], legacy_fallback: bool = True) -> dict[int, tuple[str, float]]:
+    """Записи кэша для фильмов; устаревшие отрицательные перечитываются из общей базы"""
+    entries = get_cached_many(films, legacy_fallback)
+    stale = [film for film in films if film["film_id"] in entries and _is_stale(entries[film["film_id"]])]
+    if stale:
+        # Другой воркер мог уже обновить запись в общей базе
+        entries.update(reload_cached_many(stale))
+    return entries
+
+
+def needs_fetch(film_id: int, title: str) -> bool:
+    """True, если постера фильма нет в кэше или отрицательный результат устарел"""
     if not title:
-        return "/static/images/no-poster.svg"
+        return False
+    entry = _cached([{"film_id": film_id, "title": title}]).get(film_id)
+    return entry is None or _is_stale(entry)
 
-    # Check disk cache first
-    cached = get_cached_poster(title)
-    if cached:
-        return cached
+
+def missing_posters(films: list[dict]) -> list[dict]:
+    """Фильмы, постеры которых нужно запросить в TMDB"""
+    entries = _cached([film for film in films if film.get("title")])
+    return [
+        film for film in films
+        if film.get("title") and (film["film_id"] not in entries or _is_stale(entries[film["film_id"]]))
+    ]
+
+
+def lookup_posters(films: list[dict]) -> tuple[dict[int, str], list[dict]]:
+    """Постеры страницы одной операцией с кэшем
+
+    Возвращает (film_id -> URL, фильмы, которые нужно запросить в TMDB).
+    При POSTER_PREFETCH промахи не ждут TMDB: фильм сразу получает заглушку
+    (или устаревший отрицательный результат) и ставится в очередь фоновой загрузки,
+    поэтому второй элемент всегда пуст.
+    """
+    films = [film for film in films if film.get("film_id") is not None]
+    entries = _cached([film for film in films if film.get("title")])
+    resolved: dict[int, str] = {}
+    to_fetch: list[dict] = []
+    for film in films:
+        entry = entries.get(film["film_id"])
+        if not film.get("title"):
+            resolved[film["film_id"]] = NO_POSTER_URL
+        elif entry is not None and not _is_stale(entry):
+            resolved[film["film_id"]] = entry[0]
+        elif settings.POSTER_PREFETCH:
+            enqueue_prefetch(film["film_id"], film["title"], urgent=True)
+            resolved[film["film_id"]] = entry[0] if entry is not None else NO_POSTER_URL
+        else:
+            to_fetch.append(film)
+    return resolved, to_fetch
+
+
+def get_poster(film_id: int, title: str) -> str:
+    """URL постера одного фильма"""
+    resolved, to_fetch = lookup_posters([{"film_id": film_id, "title": title}])
+    if to_fetch:
+        return fetch_poster(film_id, title)
+    return resolved[film_id]
+
+
+def fetch_poster(film_id: int, title: str) -> str:
+    """Запрашивает постер в TMDB и сохраняет результат в кэш
+
+    Одновременные запросы одного названия объединяются: в TMDB идёт первый,
+    остальные ждут его результата.
+    """
+    with _inflight_lock:
+        future = _inflight.get(title)
+        leader = future is None
+        if leader:
+            future = _inflight[title] = Future()
+    if not leader:
+        _count(coalesced=1)
+        url = future.result()
+    else:
+        try:
+            # Предыдущий запрос мог уже заполнить запись этого фильма. Запись старого формата
+            # по названию не подходит: её нельзя сохранять под film_id как результат TMDB
+            entry = _cached([{"film_id": film_id, "title": title}], legacy_fallback=False).get(film_id)
+            url = entry[0] if entry is not None and not _is_stale(entry) else _fetch_poster(title)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(url)
+        finally:
+            with _inflight_lock:
+                del _inflight[title]
+
+    # None — TMDB недоступен: не кэшируем, название повторится после восстановления
+    if url is None:
+        return NO_POSTER_URL
+    set_cached_many([(film_id, title, url)])
+    return url
+
+
+def _fetch_poster(title: str) -> str | None:
+    """URL постера по названию, NO_POSTER_URL если его нет, None если TMDB не ответил"""
+    # TMDB недоступен или исчерпан лимит — сразу заглушка, без записи в кэш
+    if not _breaker.allow():
+        return None
+    if _limiter is not None and not _limiter.try_acquire():
+        _breaker.release()
+        return None
 
     params = {
         "api_key": TMDB_API_KEY,
@@ -24,21 +294,23 @@ def get_poster_by_title(title: str) -> str:
     }
 
     try:
-        response = requests.get(TMDB_SEARCH_URL, params=params, timeout=2)
+        response = _get(TMDB_SEARCH_URL, params)
+        response.raise_for_status()
         data = response.json()
-
-        results = data.get("results", [])
-        # берём первый movie или tv
-        for item in results:
-            if item.get("media_type") in ("movie", "tv"):
-                poster_path = item.get("poster_path")
-                if poster_path:
-                    url = f"{POSTER_BASE_URL}{poster_path}"
-                    set_cached_poster(title, url)
-                    return url
     except Exception as e:
+        _count(errors=1)
+        _breaker.record_failure()
         print("TMDB fetch error:", e)
+        return None
+    _breaker.record_success()
+
+    results = data.get("results", [])
+    # берём первый movie или tv
+    for item in results:
+        if item.get("media_type") in ("movie", "tv"):
+            poster_path = item.get("poster_path")
+            if poster_path:
+                return f"{POSTER_BASE_URL}{poster_path}"
 
-    # Cache negative result to avoid repeated failing requests
-    set_cached_poster(title, "/static/images/no-poster.svg")
-    return "/static/images/no-poster.svg"
\ No newline at end of file
+    # Отрицательный результат тоже кэшируется (до POSTER_NEGATIVE_TTL)
+    return NO_POSTER_URL